@@ -0,0 +1,53 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+"""
+Compare the time and memory to materialize every combination with deepcopy vs shared
+
+python benchmarks/bench_materialize.py
+"""
+
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from configsweep import Sweep, Sweeper
+
+
+@dataclass
+class Layer:
+    name: str = ""
+    weights: list = field(default_factory=lambda: [])
+
+
+@dataclass
+class BigConfig:
+    learning_rate: float = 0.1
+    batch_size: int = 32
+    dataset: list = field(default_factory=lambda: [])
+    layers: list = field(default_factory=lambda: [])
+
+
+def make_config() -> BigConfig:
+    return BigConfig(learning_rate=Sweep([0.1, 0.01, 0.001, 0.0001]),
+                     batch_size=Sweep([16, 32, 64, 128, 256]),
+                     dataset=[float(i) for i in range(100_000)],
+                     layers=[Layer(f"layer{i}", [float(j) for j in range(1_000)]) for i in range(50)])
+
+
+def run(materialize: str):
+    sweeper = Sweeper(make_config(), materialize=materialize)
+    tracemalloc.start()
+    start = time.perf_counter()
+    # hold on to every config to measure the memory for all combinations
+    configs = [combo.config for combo in sweeper]
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(configs), elapsed, peak
+
+
+if __name__ == "__main__":
+    print(f"{'materialize':<12}{'combos':>8}{'seconds':>12}{'peak MB':>12}")
+    for materialize in Sweeper.MATERIALIZE_MODES:
+        count, elapsed, peak = run(materialize)
+        print(f"{materialize:<12}{count:>8}{elapsed:>12.3f}{peak / 2**20:>12.1f}")
@@ -0,0 +1,223 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+"""
+Benchmark suite for building, iterating and materializing sweeps
+
+python benchmarks/suite.py                                  # run and print
+python benchmarks/suite.py --save benchmarks/baseline.json  # store a baseline
+python benchmarks/suite.py --compare benchmarks/baseline.json
+
+or with nox
+
+nox -s bench
+
+Measures for each scenario:
+  build_seconds - time to create the Sweeper, i.e. copy the config and build the SweepDag
+  dag_seconds - time to build the SweepDag of each config on its own, without the copy
+  build_peak_mb - peak memory while creating the Sweeper
+  next_us - mean time per combination for __next__
+  combos_per_second - iteration throughput
+  iterate_peak_mb - peak memory while iterating, without keeping the combinations
+
+Times are the best of --repeat runs.  Memory is measured in a separate run with tracemalloc.
+Baselines are machine dependent, so compare against a baseline from the same machine.
+--compare fails on a regression and on a scenario that isn't in the baseline yet.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from itertools import islice
+from configsweep import Sweep, Sweeper
+from configsweep.sweep_dag import SweepDag
+
+
+@dataclass
+class Layer:
+    name: str = ""
+    size: int = 10
+    weights: list = field(default_factory=lambda: [])
+
+
+@dataclass
+class Model:
+    learning_rate: float = 0.1
+    layers: list = field(default_factory=lambda: [])
+
+
+def wide_flat():
+    # 12 sweeps with 4 values each, 16M combinations
+    return {f"axis{i}": Sweep(list(range(4))) for i in range(12)}
+
+
+def deep_nested():
+    # sweeps nested 6 levels deep in the values of other sweeps
+    config = {"leaf": Sweep([1, 2, 3])}
+    for depth in range(6):
+        config = {"level": Sweep([config, {"other": depth}]), "x": Sweep([depth, depth + 1])}
+    return config
+
+
+def large_list():
+    # a few sweeps in a list of 10k dicts
+    items = [{"id": i, "enabled": True} for i in range(10_000)]
+    for i in range(0, 10_000, 2_500):
+        items[i]["enabled"] = Sweep([True, False])
+    return {"items": items, "mode": Sweep(["a", "b", "c"])}
+
+
+def big_payload():
+    # big data in the config that is never swept
+    return Model(learning_rate=Sweep([0.1, 0.01, 0.001, 0.0001]),
+                 layers=[Layer(f"layer{i}", Sweep([8, 16]) if i == 0 else 32, [float(j) for j in range(2_000)])
+                         for i in range(50)])
+
+
+def many_configs():
+    # a list of configs with some data each, only the first few are iterated
+    return [{"data": [float(j) for j in range(1_000)], "seed": i, "learning_rate": Sweep([0.1, 0.01])}
+            for i in range(200)]
+
+
+# name, config factory, sweeper options, number of combinations to iterate
+SCENARIOS = [
+    ("wide_flat", wide_flat, {}, 2_000),
+    ("wide_flat_shared", wide_flat, {"materialize": "shared"}, 2_000),
+    ("wide_flat_compiled", wide_flat, {"materialize": "compiled"}, 2_000),
+    ("deep_nested", deep_nested, {}, 2_000),
+    ("large_list", large_list, {}, 48),
+    ("large_list_shared", large_list, {"materialize": "shared"}, 48),
+    ("large_list_compiled", large_list, {"materialize": "compiled"}, 48),
+    ("big_payload", big_payload, {}, 8),
+    ("big_payload_shared", big_payload, {"materialize": "shared"}, 8),
+    ("big_payload_compiled", big_payload, {"materialize": "compiled"}, 8),
+    ("many_configs", many_configs, {}, 8),
+    ("many_configs_uncopied", many_configs, {"copy_configs": False}, 8),
+]
+
+# metrics where bigger is worse, the rest are better when bigger
+LOWER_IS_BETTER = {"build_seconds", "dag_seconds", "build_peak_mb",
+                   "next_us", "iterate_peak_mb"}
+# differences smaller than this are noise, not a regression
+NOISE = {"build_seconds": 0.001, "dag_seconds": 0.001, "build_peak_mb": 0.5, "iterate_peak_mb": 0.5}
+
+
+def measure(factory, options: dict, count: int, repeat: int) -> dict:
+    build_seconds = None
+    dag_seconds = None
+    next_seconds = None
+    for _ in range(repeat):
+        configs = factory()
+        configs = configs if isinstance(configs, list) else [configs]
+        start = time.perf_counter()
+        for config in configs:
+            SweepDag(config)
+        elapsed = time.perf_counter() - start
+        dag_seconds = elapsed if dag_seconds is None else min(dag_seconds, elapsed)
+
+        # a new config each time, without copy_configs the sweeper changes the config
+        config = factory()
+        start = time.perf_counter()
+        sweeper = Sweeper(config, **options)
+        elapsed = time.perf_counter() - start
+        build_seconds = elapsed if build_seconds is None else min(build_seconds, elapsed)
+
+        iterator = iter(sweeper)
+        start = time.perf_counter()
+        iterated = sum(1 for _ in islice(iterator, count))
+        elapsed = (time.perf_counter() - start) / iterated
+        next_seconds = elapsed if next_seconds is None else min(next_seconds, elapsed)
+
+    config = factory()
+    tracemalloc.start()
+    sweeper = Sweeper(config, **options)
+    _, build_peak = tracemalloc.get_traced_memory()
+    # restart to measure iteration on its own (reset_peak needs python 3.9)
+    tracemalloc.stop()
+    tracemalloc.start()
+    for _ in islice(iter(sweeper), count):
+        pass
+    _, iterate_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"combinations": len(sweeper),
+            "build_seconds": build_seconds,
+            "dag_seconds": dag_seconds,
+            "build_peak_mb": build_peak / 2**20,
+            "next_us": next_seconds * 1e6,
+            "combos_per_second": 1 / next_seconds,
+            "iterate_peak_mb": iterate_peak / 2**20}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    # metrics worse than the baseline by more than the threshold
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        for metric, value in metrics.items():
+            if metric == "combinations" or metric not in base or not base[metric]:
+                continue
+            if abs(value - base[metric]) < NOISE.get(metric, 0):
+                continue
+            ratio = value / base[metric]
+            if metric not in LOWER_IS_BETTER:
+                ratio = 1 / ratio if ratio else float('inf')
+            if ratio > threshold:
+                regressions.append((name, metric, base[metric], value, ratio))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", help="save the results as a baseline json file")
+    parser.add_argument("--compare", help="compare with a baseline json file")
+    parser.add_argument("--threshold", type=float, default=1.5,
+                        help="ratio to the baseline that counts as a regression")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scenario", action="append",
+                        help="only run these scenarios")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'scenario':<20}{'combos':>12}{'build s':>10}{'dag s':>10}{'build MB':>10}{'next us':>10}"
+          f"{'combos/s':>12}{'iter MB':>10}")
+    for name, factory, options, count in SCENARIOS:
+        if args.scenario and name not in args.scenario:
+            continue
+        m = measure(factory, options, count, args.repeat)
+        results[name] = m
+        print(f"{name:<20}{m['combinations']:>12}{m['build_seconds']:>10.4f}{m['dag_seconds']:>10.4f}{m['build_peak_mb']:>10.2f}"
+              f"{m['next_us']:>10.1f}{m['combos_per_second']:>12.0f}{m['iterate_peak_mb']:>10.2f}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({"python": platform.python_version(),
+                       "machine": platform.machine(),
+                       "results": results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, metric, base, value, ratio in regressions:
+            print(f"REGRESSION {name} {metric}: {base:.4g} -> {value:.4g} ({ratio:.2f}x worse)")
+        # a new scenario needs a baseline too, otherwise it's never checked
+        missing = [name for name in results if name not in baseline["results"]]
+        for name in missing:
+            print(f"NO BASELINE {name}: save a new baseline with --save")
+        if len(regressions) or len(missing):
+            return 1
+        print(f"no regressions over {args.threshold}x the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
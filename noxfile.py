@@ -11,4 +11,14 @@ def test(session):
     session.install("pytest")
     session.install("classifiedjson")
 
-    session.run("pytest", "tests/")
\ No newline at end of file
+    session.run("pytest", "tests/")
+
+@nox.session
+def bench(session):
+    """
+    Run the benchmark suite and compare with the stored baseline
+    nox -s bench -- --save benchmarks/baseline.json to store a new baseline
+    """
+    session.install(".")
+    args = session.posargs or ["--compare", "benchmarks/baseline.json"]
+    session.run("python", "benchmarks/suite.py", *args)
@@ -2,13 +2,30 @@
 # SPDX-License-Identifier: MIT
 
 from configsweep.affiliate import ICreateAffiliate
+from configsweep.affiliate_cache import AffiliateCache
+from configsweep.checkpoint import SweepCheckpoint
+from configsweep.constraint import Constraint
+from configsweep.estimate import SweepEstimate
+from configsweep.halving import Hyperband, SuccessiveHalving
+from configsweep.result_store import ResultStore
 from configsweep.sweep import Sweep
+from configsweep.sweep_batch import SweepBatch
 from configsweep.sweep_combination import SweepCombination
+from configsweep.sweep_stats import SweepStats
 from configsweep.sweeper import Sweeper
 
 __version__ = "1.0.0"
 __all__ = (__version__,
+           AffiliateCache,
+           Constraint,
+           Hyperband,
            ICreateAffiliate,
+           ResultStore,
+           SuccessiveHalving,
            Sweep,
+           SweepBatch,
+           SweepCheckpoint,
+           SweepEstimate,
            Sweeper,
-           SweepCombination)
+           SweepCombination,
+           SweepStats)
@@ -0,0 +1,95 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import heapq
+from itertools import count
+from typing import Any, Callable, Dict, Tuple
+from configsweep.sweep_combination import SweepCombination
+
+
+class AffiliateCache:
+    """
+    Cache the affiliates created from the part of a config below a Sweep (see ICreateAffiliate)
+    Consecutive combinations with the same values for that part of the config share one affiliate,
+    e.g. a data loader for a high priority datasource sweep is created once for all the combinations using it
+
+    An affiliate is kept until the sweep moves past the last combination that uses it, then it's evicted.
+    This is exact when going through the combinations in order.  Out of order, an evicted affiliate is created again.
+
+    sweeper - the sweeper the combinations come from
+    on_evict - optional function called with each affiliate when it's evicted, e.g. to close it
+
+    cache = AffiliateCache(sweeper)
+    for combo in sweeper:
+        loader = cache.affiliate(combo, "datasource")
+    """
+
+    def __init__(self, sweeper, on_evict: Callable[[Any], None] = None):
+        self._sweeper = sweeper
+        self._on_evict = on_evict
+        # key -> (last combination index that uses it, affiliate)
+        self._entries: Dict[Tuple, Tuple[int, Any]] = {}
+        # (last combination index, tie breaker, key) for eviction in order
+        self._evict_heap = []
+        self._counter = count()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def affiliate(self, combo: SweepCombination, object_name: str) -> Any:
+        """
+        Get the affiliate for the part of the combination's config at the sweep object_name,
+        creating it if needed with create_affiliate()
+        """
+        self._evict_before(combo.index)
+
+        dag_index, combo_index = self._sweeper._locate(combo.index)
+        dag = self._sweeper._dags[dag_index]
+        node, value_indices = _sweep_values(dag, combo_index, object_name)
+        # values for the node and everything below it in the order they show up
+        # by column, which is the same when the dag is built again from its config after it's released
+        key = (dag_index, node.column, tuple((n.column, i)
+               for n, i in value_indices.items()))
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        value = dag.get_value(combo.config, node)
+        affiliate = value.create_affiliate()
+        last_index = self._sweeper._dags.offset(dag_index) + \
+            dag.last_combo_index(node, value_indices)
+        self._entries[key] = (last_index, affiliate)
+        heapq.heappush(self._evict_heap,
+                       (last_index, next(self._counter), key))
+        return affiliate
+
+    def clear(self):
+        """
+        Evict everything
+        """
+        self._evict_before(None)
+
+    def _evict_before(self, index: int):
+        # evict entries whose last combination is before the index, or all when index is None
+        while len(self._evict_heap) and (index is None or self._evict_heap[0][0] < index):
+            _, _, key = heapq.heappop(self._evict_heap)
+            entry = self._entries.pop(key, None)
+            if entry is not None and self._on_evict is not None:
+                self._on_evict(entry[1])
+
+
+def _sweep_values(dag, combo_index: int, object_name: str):
+    # find the sweep node for the object name in the combo
+    # and the value indices for it and all the sweep nodes below it
+    row = dag.row(combo_index)
+    for node in dag.nodes:
+        if node.object_name == object_name and row[node.column] >= 0:
+            # nodes below are in the columns after the node
+            return node, {n: row[n.column] for n in dag.nodes[node.column:node.end_column] if row[n.column] >= 0}
+    raise KeyError(
+        f"{object_name} is not a Sweep in combination {combo_index}")
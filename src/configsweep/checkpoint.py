@@ -0,0 +1,122 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import json
+import os
+import time
+from bisect import bisect_right
+from typing import List, Set
+
+
+class SweepCheckpoint:
+    """
+    Progress of a sweep saved to a local json file so the sweep can be resumed
+
+    completed - combination indices that are done, kept as sorted [start, stop) ranges
+    in_flight - combination indices that were started but not completed
+    fingerprint - fingerprint of the sweep definition the progress is for
+
+    Saves are atomic (write a temp file and replace), so a crash leaves the last save in place
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str, fingerprint: str, save_every: int = 100, save_seconds: float = 30.0):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.save_every = save_every
+        self.save_seconds = save_seconds
+        self.in_flight: Set[int] = set()
+        # sorted, non-overlapping and non-adjacent [start, stop) ranges
+        self._starts: List[int] = []
+        self._stops: List[int] = []
+        self._unsaved = 0
+        self._last_save = time.monotonic()
+
+    @classmethod
+    def load(cls, path: str, fingerprint: str, **kwargs) -> "SweepCheckpoint":
+        """
+        Load the checkpoint at path or start a new one if there isn't a file
+        Raises ValueError if the checkpoint is for a different sweep definition
+        """
+        checkpoint = cls(path, fingerprint, **kwargs)
+        if not os.path.exists(path):
+            return checkpoint
+
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if data.get("version") != cls.VERSION:
+            raise ValueError(
+                f"Checkpoint {path} has unsupported version {data.get('version')}")
+        if data["fingerprint"] != fingerprint:
+            raise ValueError(
+                f"Checkpoint {path} is for a different sweep definition, can't resume")
+        for start, stop in data["completed"]:
+            checkpoint._starts.append(start)
+            checkpoint._stops.append(stop)
+        # in flight from last time never completed, so they run again
+        checkpoint.in_flight = set(data["in_flight"])
+        return checkpoint
+
+    @property
+    def completed_count(self) -> int:
+        return sum(stop - start for start, stop in zip(self._starts, self._stops))
+
+    def is_completed(self, index: int) -> bool:
+        i = bisect_right(self._starts, index) - 1
+        return i >= 0 and index < self._stops[i]
+
+    def next_incomplete(self, index: int) -> int:
+        """
+        The first index at or after index that isn't completed
+        """
+        i = bisect_right(self._starts, index) - 1
+        if i >= 0 and index < self._stops[i]:
+            return self._stops[i]
+        return index
+
+    def start(self, index: int):
+        self.in_flight.add(index)
+        self._changed()
+
+    def complete(self, index: int):
+        self.in_flight.discard(index)
+        if not self.is_completed(index):
+            self._add_completed(index)
+        self._changed()
+
+    def save(self):
+        data = {"version": SweepCheckpoint.VERSION,
+                "fingerprint": self.fingerprint,
+                "completed": [[start, stop] for start, stop in zip(self._starts, self._stops)],
+                "in_flight": sorted(self.in_flight)}
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self._unsaved = 0
+        self._last_save = time.monotonic()
+
+    def _changed(self):
+        self._unsaved += 1
+        if self._unsaved >= self.save_every or time.monotonic() - self._last_save >= self.save_seconds:
+            self.save()
+
+    def _add_completed(self, index: int):
+        # merge with the ranges before and after when adjacent
+        i = bisect_right(self._starts, index)
+        joins_before = i > 0 and self._stops[i - 1] == index
+        joins_after = i < len(self._starts) and self._starts[i] == index + 1
+        if joins_before and joins_after:
+            self._stops[i - 1] = self._stops[i]
+            del self._starts[i]
+            del self._stops[i]
+        elif joins_before:
+            self._stops[i - 1] = index + 1
+        elif joins_after:
+            self._starts[i] = index
+        else:
+            self._starts.insert(i, index)
+            self._stops.insert(i, index + 1)
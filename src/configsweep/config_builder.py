@@ -0,0 +1,183 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import types
+from copy import copy, deepcopy
+from dataclasses import fields, is_dataclass
+from enum import Enum
+from typing import Any, Callable, Dict, List, Tuple
+from configsweep.sweep import Sweep
+from configsweep.sweep_dag import SweepDag, _attribute_items
+
+# values deepcopy doesn't copy
+_ATOMIC_TYPES = (type(None), bool, int, float, complex, str, bytes, type, range, types.FunctionType,
+                 types.BuiltinFunctionType, type(Ellipsis), type(NotImplemented))
+# deeper than this is built with deepcopy (python limits how deep an expression can be)
+_MAX_DEPTH = 50
+# containers with more items than this are built in parts, each in its own function.
+# Keeps the code objects small, tools that look up line numbers (tracemalloc, profilers) are slow on huge ones
+_PART_SIZE = 100
+
+
+def compile_builder(dag: SweepDag) -> Callable[[Any], Any]:
+    """
+    Compile the dag's config into a function that builds a new config for a combination row
+
+    The function is generated python code with the structure of the config: dict and list displays,
+    dataclass constructors (or __new__ when the constructor can't rebuild the object as is) and
+    the sweep values picked by the row.  Flat lists and dicts of atomic values are copied with list() and dict().
+    Building a config is then proportional to its size without the memo and reflection of deepcopy,
+    and gives the same config as a deepcopy of the config with the values applied.
+
+    Raises ValueError if the config can't be compiled, e.g. the same object is in more than one place
+    The sweep objects must be in place in the config (see SweepDag.apply_sweep_to_config)
+    """
+    compiler = _Compiler(dag)
+    expression = compiler.expression(dag.config, 0, (dag.root_node, 0, ()))
+    compiler.functions.append(f"def build(row):\n    return {expression}\n")
+    code = "\n".join(compiler.functions)
+    namespace = dict(compiler.constants)
+    namespace.update({"_new": _new, "_deepcopy": deepcopy, "_like": _like})
+    try:
+        exec(compile(code, "<configsweep builder>", "exec"), namespace)
+    except (SyntaxError, RecursionError, MemoryError) as e:
+        raise ValueError(f"Can't compile a builder for the config: {e}") from e
+    return namespace["build"]
+
+
+class _Compiler:
+    def __init__(self, dag: SweepDag):
+        self._dag = dag
+        # node by (parent node, parent value index, path), so the same Sweep object in two places is two sweeps
+        self._nodes = {(id(node.parent), node.parent_value_index, node.path): node for node in dag.nodes}
+        self.constants: Dict[str, Any] = {}
+        self._constant_names: Dict[int, str] = {}
+        self.functions: List[str] = []
+        # non atomic objects already in the builder, to find the ones in more than one place
+        self._seen = set()
+
+    def expression(self, value: Any, depth: int, where: Tuple) -> str:
+        # where is (parent node, parent value index, path) of the value to find the nodes of the sweeps in it
+        if isinstance(value, Sweep):
+            parent, parent_value_index, path = where
+            return self._sweep_expression(self._nodes[(id(parent), parent_value_index, path)], path)
+        if _is_atomic(value):
+            return self._constant(value)
+
+        if id(value) in self._seen:
+            raise ValueError(
+                "Can't compile a builder for a config with the same object in more than one place")
+        self._seen.add(id(value))
+        has_sweep = id(value) in self._dag.sweep_containers
+        if depth > _MAX_DEPTH:
+            if has_sweep:
+                raise ValueError(
+                    f"Can't compile a builder for a sweep more than {_MAX_DEPTH} containers deep")
+            return f"_deepcopy({self._constant(value)})"
+
+        def child(v: Any, step: Tuple) -> str:
+            return self.expression(v, depth + 1, (where[0], where[1], where[2] + (step,)))
+
+        value_type = type(value)
+        if value_type is list or value_type is dict:
+            items = value if value_type is list else value.values()
+            if not has_sweep and all(_is_atomic(v) for v in items):
+                # nothing to build inside it
+                return f"{value_type.__name__}({self._constant(value)})"
+            if value_type is list:
+                return self._parts(list(enumerate(value)), "[{}]", "*", lambda iv: child(iv[1], (None, None, iv[0])))
+            return self._parts(list(value.items()), "{{{}}}", "**",
+                               lambda kv: f'{self._constant(kv[0])}: {child(kv[1], (None, kv[0], None))}')
+        if value_type is tuple:
+            if len(value) == 0:
+                return "()"
+            return self._parts(list(enumerate(value)), "({},)", "*", lambda iv: child(iv[1], (None, None, iv[0])))
+        if isinstance(value, tuple) and hasattr(value, '_fields'):
+            # named tuple
+            return f"{self._constant(value_type)}({', '.join(child(v, (None, None, i)) for i, v in enumerate(value))})"
+        if isinstance(value, (dict, list)):
+            # subclass, e.g. OrderedDict or defaultdict, copied so it keeps anything else it has
+            if isinstance(value, dict):
+                items = [(k, child(v, (None, k, None))) for k, v in value.items()]
+            else:
+                items = [(i, child(v, (None, None, i))) for i, v in enumerate(value)]
+            return f"_like({self._constant(value)}, [{', '.join(f'({self._constant(k)}, {e})' for k, e in items)}])"
+        if is_dataclass(value) and not isinstance(value, type) and not isinstance(value, Enum):
+            items = _attribute_items(value)
+            arguments = ', '.join(f'{name}={child(v, (name, None, None))}' for name, v in items)
+            if _can_construct(value, items):
+                return f"{self._constant(value_type)}({arguments})"
+            return f"_new({self._constant(value_type)}, {arguments})"
+        if has_sweep:
+            raise ValueError(
+                f"Can't compile a builder for a sweep in a {value_type.__qualname__}")
+        return f"_deepcopy({self._constant(value)})"
+
+    def _parts(self, items: List, display: str, unpack: str, item_expression: Callable[[Any], str]) -> str:
+        # display of the items, with a function for each part of a big container unpacked into the display
+        if len(items) <= _PART_SIZE:
+            return display.format(', '.join(item_expression(item) for item in items))
+        names = []
+        for start in range(0, len(items), _PART_SIZE):
+            part = display.format(', '.join(item_expression(item) for item in items[start:start + _PART_SIZE]))
+            # named after the functions for the parts inside it
+            name = f"part_{len(self.functions)}"
+            self.functions.append(f"def {name}(row):\n    return {part}\n")
+            names.append(name)
+        return display.format(', '.join(f"{unpack}{name}(row)" for name in names))
+
+    def _sweep_expression(self, node, path: Tuple) -> str:
+        column = node.column
+        values = self._constant(tuple(node.values))
+        if all(_is_atomic(v) for v in node.values):
+            return f"{values}[row[{column}]]"
+        # a function to build each value, only the one for the row is called
+        names = []
+        for value_index, value in enumerate(node.values):
+            name = f"build_{column}_{value_index}"
+            self.functions.append(
+                f"def {name}(row):\n    return {self.expression(value, 0, (node, value_index, path))}\n")
+            names.append(name)
+        return f"({', '.join(names)},)[row[{column}]](row)"
+
+    def _constant(self, value: Any) -> str:
+        name = self._constant_names.get(id(value))
+        if name is None:
+            name = f"c{len(self.constants)}"
+            self._constant_names[id(value)] = name
+            self.constants[name] = value
+        return name
+
+
+def _is_atomic(value: Any) -> bool:
+    if isinstance(value, _ATOMIC_TYPES) or isinstance(value, Enum):
+        return True
+    if type(value) in (tuple, frozenset):
+        return all(_is_atomic(v) for v in value)
+    return False
+
+
+def _can_construct(value: Any, items: List) -> bool:
+    # the constructor rebuilds the object as is if it's the generated one, takes all the fields and does nothing else
+    # (a subclass that isn't a dataclass itself can have its own __init__)
+    params = type(value).__dict__.get('__dataclass_params__')
+    if params is None or not params.init or hasattr(type(value), '__post_init__'):
+        return False
+    field_list = fields(value)
+    return all(f.init for f in field_list) and len(field_list) == len(items)
+
+
+def _new(cls: type, **attributes) -> Any:
+    # same as deepcopy, without calling the constructor.  Works for frozen dataclasses too
+    value = cls.__new__(cls)
+    for name, attribute in attributes.items():
+        object.__setattr__(value, name, attribute)
+    return value
+
+
+def _like(template: Any, items: List) -> Any:
+    # shallow copy of a dict or list subclass with the items replaced
+    value = copy(template)
+    for key, item in items:
+        value[key] = item
+    return value
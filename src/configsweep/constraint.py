@@ -0,0 +1,21 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+from dataclasses import dataclass
+from typing import Callable, List
+
+
+@dataclass
+class Constraint:
+    """
+    Leave out the combinations where the predicate is False, e.g.
+    Constraint(["strategy.min", "strategy.max"], lambda min, max: min <= max)
+
+    paths - object names of the sweeps the predicate reads, same as the names in SweepCombination.assignments
+    predicate - called with the value of each sweep in the order of the paths
+
+    The predicate is called as soon as the sweeps it reads have values, so whole groups of combinations are left out at once
+    A combination that doesn't have one of the sweeps (e.g. a nested sweep under another value) isn't checked
+    """
+    paths: List[str]
+    predicate: Callable[..., bool]
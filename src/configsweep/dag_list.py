@@ -0,0 +1,133 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import time
+from bisect import bisect_right
+from typing import Any, Iterator, List, Tuple
+from configsweep.constraint import Constraint
+from configsweep.sweep_dag import SweepDag
+from configsweep.sweep_stats import SweepStats
+
+
+class DagList:
+    """
+    SweepDag for each config template, built on first access
+    A dag can be released when it's no longer needed, e.g. after iterating its combinations,
+    and is built again from its template if it's needed again.
+    The number of combinations in each dag is kept, so global indices don't need the dags built again.
+    Offsets are only worked out as far as needed, so the first configs can be used without building the rest
+
+    templates - the configs with the sweep objects in place
+    lazy, constraints - options for each SweepDag
+    stats - optional SweepStats to record each dag built
+    """
+
+    def __init__(self, templates: List, lazy: bool, constraints: List[Constraint], stats: SweepStats = None):
+        self._templates = templates
+        self._lazy = lazy
+        self._constraints = constraints
+        self.stats = stats
+        self._dags: List[SweepDag] = [None] * len(templates)
+        # number of combinations in each dag, once it's been built
+        self._counts: List[int] = [None] * len(templates)
+        # global index of the first combination of each dag, as far as the counts are known, and where the last one ends
+        self._offsets = [0]
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["stats"] = None
+        return state
+
+    def __len__(self) -> int:
+        return len(self._dags)
+
+    def __getitem__(self, dag_index: int) -> SweepDag:
+        dag = self._dags[dag_index]
+        if dag is None:
+            dag = self._build(self._templates[dag_index])
+            self._dags[dag_index] = dag
+            self._counts[dag_index] = dag.count
+        return dag
+
+    def __iter__(self) -> Iterator[SweepDag]:
+        for dag_index in range(len(self._dags)):
+            yield self[dag_index]
+
+    def _build(self, config: Any) -> SweepDag:
+        if self.stats is None:
+            return SweepDag(config, self._lazy, self._constraints)
+        start = time.perf_counter()
+        dag = SweepDag(config, self._lazy, self._constraints)
+        self.stats.record("build", time.perf_counter() - start)
+        self.stats.record_dag(dag)
+        dag.stats = self.stats
+        return dag
+
+    def built(self) -> List[SweepDag]:
+        """
+        The dags that are built right now
+        """
+        return [dag for dag in self._dags if dag is not None]
+
+    def release(self, dag_index: int):
+        """
+        Put the sweep objects back in the dag's config and drop the dag
+        """
+        dag = self._dags[dag_index]
+        if dag is not None:
+            dag.apply_sweep_to_config()
+            self._dags[dag_index] = None
+
+    def replace(self, dags: List[SweepDag]) -> "DagList":
+        """
+        Copy of the list with these dags in place of the built ones, e.g. copies without their rows
+        """
+        dag_list = DagList(self._templates, self._lazy, self._constraints)
+        dag_list._dags = list(dags)
+        dag_list._counts = [dag.count for dag in dags]
+        dag_list._offsets = [0]
+        return dag_list
+
+    def count(self, dag_index: int) -> int:
+        """
+        Number of combinations in the dag
+        """
+        if self._counts[dag_index] is None:
+            self[dag_index]
+        return self._counts[dag_index]
+
+    def offset(self, dag_index: int) -> int:
+        """
+        Global index of the first combination of the dag
+        """
+        while len(self._offsets) <= dag_index:
+            self._count_next()
+        return self._offsets[dag_index]
+
+    def total(self) -> int:
+        """
+        Number of combinations in all the dags, builds the ones that haven't been counted yet
+        """
+        return self.offset(len(self._dags))
+
+    def limit(self, stop: int) -> int:
+        """
+        Smaller of stop and the total, only counting the dags before stop
+        """
+        while self._offsets[-1] < stop and len(self._offsets) <= len(self._dags):
+            self._count_next()
+        return min(stop, self._offsets[-1])
+
+    def locate(self, index: int) -> Tuple[int, int]:
+        """
+        Dag index and combo index within the dag for the global combination index
+        """
+        if index < 0 or index >= self.limit(index + 1):
+            raise IndexError(f"combination index {index} out of range")
+        # empty dags (all combinations left out by constraints) share the offset of the next dag
+        dag_index = bisect_right(self._offsets, index) - 1
+        return dag_index, index - self._offsets[dag_index]
+
+    def _count_next(self):
+        dag_index = len(self._offsets) - 1
+        self._offsets.append(self._offsets[dag_index] + self.count(dag_index))
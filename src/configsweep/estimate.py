@@ -0,0 +1,88 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import time
+from array import array
+from copy import deepcopy
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Union
+from configsweep.sweep_dag import SweepDag
+from configsweep.sweep_stats import deep_sizeof
+
+
+@dataclass
+class SweepEstimate:
+    """
+    Size and cost of a sweep worked out before running it, see estimate
+
+    combinations - number of combinations, before any constraints leave some out
+    cardinalities - number of values of each sweep by object name
+    config_bytes - estimate of the bytes deep copied for a combination's config (the largest for a list of configs)
+    all_configs_bytes - estimate of the bytes to keep the configs of all the combinations, e.g. list(sweeper)
+    rows_bytes - bytes for the rows of value indices when not lazy (Sweeper(config, lazy=False))
+    copy_seconds - rough time to deep copy the configs of all the combinations, from timing one copy of each config
+    warnings - what won't fit in the memory budget
+    """
+    combinations: int = 0
+    cardinalities: Dict[str, int] = field(default_factory=dict)
+    config_bytes: int = 0
+    all_configs_bytes: int = 0
+    rows_bytes: int = 0
+    copy_seconds: float = 0.0
+    warnings: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def estimate(config: Union[Any, List], memory_budget: int = None) -> SweepEstimate:
+    """
+    Estimate the size of a sweep before running it, without building any combinations
+
+    config - a config or a list of configs, same as for Sweeper
+    memory_budget - optional bytes available.  Warns when not lazy or keeping all the configs would take more
+
+    The combinations are counted from the number of values of each sweep.
+    The bytes are for the first combination of each config, so combinations with bigger sweep values take more.
+    The config is changed to size the first combination and put back the way it was.
+    """
+    if memory_budget is not None and memory_budget <= 0:
+        raise ValueError(f"memory_budget must be more than 0, got {memory_budget}")
+    if config is None:
+        config_list = []
+    else:
+        config_list = config if isinstance(config, list) else [config]
+
+    result = SweepEstimate()
+    itemsize = array('i').itemsize
+    for c in config_list:
+        dag = SweepDag(c)
+        result.combinations += dag.count
+        for node in dag.nodes:
+            result.cardinalities[node.object_name] = max(
+                len(node.values), result.cardinalities.get(node.object_name, 0))
+        result.rows_bytes += dag.count * dag.width * itemsize
+
+        # size and time to copy the first combination's config
+        dag.apply_combo(0)
+        try:
+            config_bytes = deep_sizeof(c)
+            start = time.perf_counter()
+            deepcopy(c)
+            copy_seconds = time.perf_counter() - start
+        finally:
+            dag.apply_sweep_to_config()
+        result.config_bytes = max(result.config_bytes, config_bytes)
+        result.all_configs_bytes += dag.count * config_bytes
+        result.copy_seconds += dag.count * copy_seconds
+
+    if memory_budget is not None:
+        if result.rows_bytes > memory_budget:
+            result.warnings.append(
+                f"Not lazy, the rows for {result.combinations} combinations take about {result.rows_bytes} bytes, "
+                f"over the memory budget of {memory_budget}.  Use lazy=True")
+        if result.all_configs_bytes > memory_budget:
+            result.warnings.append(
+                f"Keeping the configs of all {result.combinations} combinations takes about {result.all_configs_bytes} bytes, "
+                f"over the memory budget of {memory_budget}.  Iterate the combinations without keeping them")
+    return result
@@ -0,0 +1,113 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import csv
+import json
+from enum import Enum
+from typing import Any, Callable, Iterable, List, TextIO, Union
+
+EXPORT_FORMATS = ("jsonl", "csv")
+
+
+def export_combinations(sweeper,
+                        file: Union[str, TextIO],
+                        format: str,
+                        ranges: Iterable[range],
+                        include_config: bool,
+                        buffer_size: int) -> int:
+    """
+    Write the combinations for the ranges of indices to a file and return the number written
+
+    jsonl - one json object per line with the index, assignments (value index by object name),
+            values (value by object name, a short description for values that aren't json scalars)
+            and the config with classifiedjson when include_config
+    csv - a header and one row per combination with the index, a column for each sweep object name
+          (empty when the sweep isn't in the combination) and the config with classifiedjson when include_config
+
+    Only the combination rows are decoded, configs aren't copied. With include_config, the values are applied
+    to the sweeper's own copy of the config to write it (the caller's config without copy_configs,
+    which is put back the way it was after).
+    Lines are written buffer_size at a time, so memory doesn't grow with the number of combinations.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Unknown export format {format}.  Use one of {', '.join(EXPORT_FORMATS)}")
+    if buffer_size < 1:
+        raise ValueError(f"buffer_size must be at least 1, got {buffer_size}")
+    dumps = _config_dumps() if include_config else None
+
+    try:
+        if isinstance(file, str):
+            with open(file, 'w', newline='') as f:
+                return _export(sweeper, f, format, ranges, dumps, buffer_size)
+        return _export(sweeper, file, format, ranges, dumps, buffer_size)
+    finally:
+        if dumps is not None and not sweeper._copy:
+            # the caller's configs, so put the sweep objects back
+            sweeper._sweep_configs()
+
+
+def _export(sweeper, file: TextIO, format: str, ranges: Iterable[range], dumps: Callable, buffer_size: int) -> int:
+    if format == "csv":
+        # one column per object name in the order they show up in the dags
+        paths = list(dict.fromkeys(
+            node.object_name for dag in sweeper._dags for node in dag.nodes))
+        columns = {path: i + 1 for i, path in enumerate(paths)}
+        writer = csv.writer(file)
+        writer.writerow(["index"] + paths + (["config"] if dumps else []))
+
+    count = 0
+    buffer = []
+    for indices in ranges:
+        for index in indices:
+            dag_index, combo_index = sweeper._locate(index)
+            dag = sweeper._dags[dag_index]
+            row = dag.row(combo_index)
+            nodes = [node for node in dag.nodes if row[node.column] >= 0]
+            if dumps is not None:
+                dag.apply_combo(combo_index)
+                config = dumps(sweeper._config_templates[dag_index])
+
+            if format == "csv":
+                cells = [""] * (len(paths) + 1)
+                cells[0] = index
+                for node in nodes:
+                    cells[columns[node.object_name]] = _json_value(node, row[node.column])
+                if dumps is not None:
+                    cells.append(config)
+                buffer.append(cells)
+            else:
+                line = (f'{{"index": {index}, '
+                        f'"assignments": {json.dumps({node.object_name: row[node.column] for node in nodes})}, '
+                        f'"values": {json.dumps({node.object_name: _json_value(node, row[node.column]) for node in nodes})}')
+                buffer.append(f'{line}, "config": {config}}}\n' if dumps is not None else f'{line}}}\n')
+
+            count += 1
+            if len(buffer) >= buffer_size:
+                _write(file, format, buffer)
+                buffer = []
+    _write(file, format, buffer)
+    return count
+
+
+def _write(file: TextIO, format: str, buffer: List):
+    if format == "csv":
+        csv.writer(file).writerows(buffer)
+    else:
+        file.write("".join(buffer))
+
+
+def _json_value(node, value_index: int) -> Any:
+    value = node.values[value_index]
+    if value is None or isinstance(value, (bool, int, float, str)) and not isinstance(value, Enum):
+        return value
+    return node.value_description(value_index)
+
+
+def _config_dumps() -> Callable[[Any], str]:
+    try:
+        import classifiedjson
+    except ImportError as e:
+        raise ImportError(
+            "include_config needs classifiedjson, pip install configsweep[classifiedjson]") from e
+    return classifiedjson.dumps
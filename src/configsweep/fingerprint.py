@@ -0,0 +1,178 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import inspect
+import json
+import types
+from dataclasses import is_dataclass
+from enum import Enum
+from typing import Any, Dict, List, Tuple
+from configsweep.sweep import Sweep
+from configsweep.sweep_dag import _attribute_items
+
+# values identified by name rather than by what's in them
+_NAMED_TYPES = (type, types.FunctionType, types.BuiltinFunctionType)
+
+
+def canonical(value: Any) -> Any:
+    """
+    Stable json compatible form of a value to fingerprint it
+    Dict items, fields and sets are sorted, so the order they were added in doesn't matter
+    Classes and functions are identified by module and name, never by id, so it's stable across runs
+    """
+    if value is None or isinstance(value, (bool, int, float, str)) and not isinstance(value, Enum):
+        return value
+    elif isinstance(value, Enum):
+        return {"__enum__": _class_name(value), "name": value.name}
+    elif isinstance(value, _NAMED_TYPES):
+        return {"__named__": _class_name(value), "name": _function_name(value)}
+    elif isinstance(value, Sweep):
+        return {"__sweep__": canonical(value.values), "priority": value.priority}
+    elif isinstance(value, dict):
+        return {"__dict__": _sorted([[canonical(k), canonical(v)] for k, v in value.items()])}
+    elif isinstance(value, list):
+        return [canonical(v) for v in value]
+    elif isinstance(value, tuple):
+        return {"__tuple__": [canonical(v) for v in value]}
+    elif isinstance(value, (set, frozenset)):
+        return {"__set__": _sorted([canonical(v) for v in value])}
+    elif is_dataclass(value) or hasattr(value, '__dict__'):
+        return {"__class__": _class_name(value),
+                "fields": _sorted([[name, canonical(v)] for name, v in _fields(value)])}
+    else:
+        return {"__class__": _class_name(value), "repr": repr(value)}
+
+
+def fingerprint(value: Any) -> str:
+    """
+    sha256 hex digest of the canonical form of the value
+    """
+    return hashlib.sha256(_dumps(canonical(value)).encode()).hexdigest()
+
+
+def sweep_fingerprint(dags) -> str:
+    """
+    Fingerprint of the sweep definition from the configs and the sweep nodes in the dags
+    Changes if a sweep is added, removed, moved, re-prioritized or its values change,
+    if any other value in the configs changes
+    or if the constraints change their paths, predicate function (its source or code) or the combinations they leave out
+
+    The sweep objects must be in place in the config (see SweepDag.apply_sweep_to_config)
+    """
+    h = hashlib.sha256()
+    for dag in dags:
+        h.update(f"dag {dag.count}\n".encode())
+        h.update(_dumps(canonical(dag.config)).encode())
+        h.update(b"\n")
+        _fingerprint_node(h, dag.root_node)
+        for constraint in dag.constraints:
+            h.update(_dumps(["constraint", list(constraint.paths),
+                     _function_name(constraint.predicate), _function_code(constraint.predicate)]).encode())
+            h.update(b"\n")
+    return h.hexdigest()
+
+
+class CombinationKeys:
+    """
+    Keys for the configs of a dag's combinations without materializing them
+    The key is the same for the same config in any sweep, e.g. after a value is added to a sweep,
+    and doesn't depend on the order of dict items, fields or sets (see canonical)
+
+    Each container is fingerprinted from the fingerprints of the values in it, so only the containers
+    on the path to a sweep are done for each combination.  The rest are done once and kept by id.
+    Each sweep's node is found by where the sweep is, so the same Sweep object in two places is two sweeps.
+    The sweep objects must be in place in the config (see SweepDag.apply_sweep_to_config)
+    """
+
+    def __init__(self, dag):
+        self._dag = dag
+        # node by (parent node, parent value index, path), the path alone is the same for sweeps
+        # in different values of the same sweep
+        self._nodes = {(id(node.parent), node.parent_value_index, node.path): node for node in dag.nodes}
+        # digests for the values without a sweep below them by id (the dag keeps them alive)
+        self._digests: Dict[int, str] = {}
+
+    def key(self, row) -> str:
+        return self._digest(self._dag.config, row, (), self._dag.root_node, 0)
+
+    def _digest(self, value: Any, row, path: Tuple, parent, parent_value_index: int) -> str:
+        # path, parent and parent value index are where the value is, to find the nodes of the sweeps below it
+        if isinstance(value, Sweep):
+            node = self._nodes[(id(parent), parent_value_index, path)]
+            value_index = row[node.column]
+            return self._digest(node.values[value_index], row, path, node, value_index)
+
+        fixed = id(value) not in self._dag.sweep_containers
+        if fixed:
+            digest = self._digests.get(id(value))
+            if digest is not None:
+                return digest
+
+        def digest(v: Any, step: Tuple) -> str:
+            return self._digest(v, row, path + (step,), parent, parent_value_index)
+
+        if isinstance(value, dict):
+            form = ["dict", _sorted([[canonical(k), digest(v, (None, k, None))] for k, v in value.items()])]
+        elif isinstance(value, list):
+            form = ["list", [digest(v, (None, None, i)) for i, v in enumerate(value)]]
+        elif isinstance(value, tuple):
+            form = ["tuple", [digest(v, (None, None, i)) for i, v in enumerate(value)]]
+        elif isinstance(value, (set, frozenset)):
+            form = ["set", sorted(digest(v, (None, None, i)) for i, v in enumerate(value))]
+        elif not isinstance(value, (Enum,) + _NAMED_TYPES) and (is_dataclass(value) or hasattr(value, '__dict__')):
+            form = ["class", _class_name(value),
+                    _sorted([[name, digest(v, (name, None, None))] for name, v in _fields(value)])]
+        else:
+            form = ["value", canonical(value)]
+        digest = hashlib.sha256(_dumps(form).encode()).hexdigest()
+        if fixed and not isinstance(value, (bool, int, float, str)):
+            self._digests[id(value)] = digest
+        return digest
+
+
+def _fingerprint_node(h, node):
+    h.update(_dumps([node.object_name, node.parent_value_index,
+             node.priority, canonical(node.values)]).encode())
+    h.update(b"\n")
+    for child in node.child_nodes:
+        _fingerprint_node(h, child)
+
+
+def _fields(value: Any) -> List[Tuple[str, Any]]:
+    # fields of a dataclass (slotted too) or attributes of another object, skipping dunders
+    if is_dataclass(value):
+        return _attribute_items(value)
+    return [(name, v) for name, v in vars(value).items() if not name.startswith('__')]
+
+
+def _class_name(value: Any) -> str:
+    cls = type(value)
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def _function_name(fn: Any) -> str:
+    return f"{getattr(fn, '__module__', None)}.{getattr(fn, '__qualname__', type(fn).__qualname__)}"
+
+
+def _function_code(fn: Any) -> Any:
+    # what the function does, since every lambda has the same name
+    # the source when it's available, so it's the same for every python version, otherwise the byte code
+    code = getattr(fn, '__code__', None)
+    if code is None:
+        return None
+    try:
+        body = inspect.getsource(fn)
+    except (OSError, TypeError):
+        body = [code.co_code.hex(), repr(code.co_consts), list(code.co_names)]
+    # values it uses from where it was defined
+    cells = [canonical(cell.cell_contents) for cell in fn.__closure__ or ()]
+    return [body, cells]
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(',', ':'), default=repr)
+
+
+def _sorted(items: list) -> list:
+    return sorted(items, key=_dumps)
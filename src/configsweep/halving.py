@@ -0,0 +1,139 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import math
+import random
+from functools import partial
+from typing import Any, Callable, List, Sequence, Tuple, Union
+
+Budget = Union[int, float]
+
+
+class SuccessiveHalving:
+    """
+    Run combinations with a small budget first and only give a bigger budget to the best ones
+
+    sweeper - the sweeper the combinations come from
+    min_budget - least budget for the first rung, e.g. steps or epochs
+    max_budget - budget for the last rung.  The rungs before it have max_budget / eta, max_budget / eta**2, ...
+                 down to min_budget, as in Hyperband, so every rung is exactly eta times the one before
+    eta - each rung has eta times the budget of the rung before it and keeps the best 1 / eta of its combinations
+    maximize - higher scores are better, otherwise lower scores are better
+
+    fn(combo, budget) returns the score for the combination trained with the budget.
+    Each rung runs its combinations in parallel with Sweeper.map, so for the process executor fn must be picklable.
+    Combinations are identified by their index, so it's the same combination in every rung.
+
+    halving = SuccessiveHalving(sweeper, min_budget=1, max_budget=27)
+    best = halving.run(train)
+    """
+
+    def __init__(self, sweeper, min_budget: Budget, max_budget: Budget, eta: int = 3, maximize: bool = True):
+        if eta < 2:
+            raise ValueError(f"eta must be at least 2, got {eta}")
+        if min_budget <= 0 or max_budget < min_budget:
+            raise ValueError(
+                f"Budgets must be 0 < min_budget <= max_budget, got {min_budget} and {max_budget}")
+        self.sweeper = sweeper
+        self.min_budget = min_budget
+        self.max_budget = max_budget
+        self.eta = eta
+        self.maximize = maximize
+        # (rung, index, budget, score) for every combination run
+        self.history: List[Tuple[int, int, Budget, Any]] = []
+
+    def budgets(self) -> List[Budget]:
+        """
+        Budget for each rung, max_budget / eta**k for the largest k that's still at least min_budget, up to max_budget
+        Whole numbers stay ints for an int max_budget, e.g. 1 to 9 is [1, 3, 9] and 1 to 10 is [10 / 9, 10 / 3, 10]
+        """
+        rungs = 1
+        while self.min_budget * self.eta ** rungs <= self.max_budget:
+            rungs += 1
+        budgets = []
+        for k in range(rungs - 1, -1, -1):
+            divisor = self.eta ** k
+            if isinstance(self.max_budget, int) and self.max_budget % divisor == 0:
+                budgets.append(self.max_budget // divisor)
+            else:
+                budgets.append(self.max_budget / divisor)
+        return budgets
+
+    def run(self,
+            fn: Callable[[Any, Budget], Any],
+            indices: Sequence[int] = None,
+            callback: Callable[[int, Budget, Any], None] = None,
+            executor: str = "process",
+            max_workers: int = None) -> List[Tuple[int, Budget, Any]]:
+        """
+        Run the rungs and return (index, budget, score) for the combinations in the last rung, best first
+
+        indices - combinations to start with, defaults to all of them, e.g. a sample from Sweeper.sample
+        callback - called with (index, budget, score) as each score comes in
+        """
+        if indices is None:
+            indices = range(len(self.sweeper))
+        return self._run(fn, list(indices), self.budgets(), callback, executor, max_workers)
+
+    def _run(self, fn, indices: List[int], budgets: List[Budget], callback, executor: str, max_workers: int):
+        scored = []
+        for rung, budget in enumerate(budgets):
+            scored = []
+            for index, score in self.sweeper.map(partial(_call_with_budget, fn, budget), executor=executor,
+                                                 max_workers=max_workers, ordered=False, indices=indices):
+                self.history.append((rung, index, budget, score))
+                if callback is not None:
+                    callback(index, budget, score)
+                scored.append((index, budget, score))
+            scored = self._sorted(scored)
+            # keep the best for the next rung, at least one
+            indices = [index for index, _, _ in scored[:max(1, len(scored) // self.eta)]]
+        return scored
+
+    def _sorted(self, scored: List[Tuple[int, Budget, Any]]) -> List[Tuple[int, Budget, Any]]:
+        # best first, ties in index order
+        return sorted(sorted(scored), key=lambda s: s[2], reverse=self.maximize)
+
+
+class Hyperband(SuccessiveHalving):
+    """
+    Successive halving with several brackets that trade off the number of combinations against the starting budget
+    The first bracket starts many combinations at min_budget, the last one runs a few at max_budget only.
+    Each bracket starts with its own sample of the sweep
+
+    seed - seed for the samples, so the same combinations are picked every time
+    """
+
+    def __init__(self, sweeper, min_budget: Budget, max_budget: Budget, eta: int = 3, maximize: bool = True, seed: int = None):
+        super().__init__(sweeper, min_budget, max_budget, eta, maximize)
+        self.seed = seed
+
+    def run(self,
+            fn: Callable[[Any, Budget], Any],
+            indices: Sequence[int] = None,
+            callback: Callable[[int, Budget, Any], None] = None,
+            executor: str = "process",
+            max_workers: int = None) -> List[Tuple[int, Budget, Any]]:
+        """
+        Run the brackets and return (index, budget, score) for the combinations in the last rung of every bracket, best first
+
+        indices - combinations to sample from, defaults to all of them
+        callback - called with (index, budget, score) as each score comes in
+        """
+        population = range(len(self.sweeper)) if indices is None else list(indices)
+        budgets = self.budgets()
+        brackets = len(budgets)
+        results = []
+        for bracket in range(brackets):
+            # bracket 0 starts at min_budget with the most combinations
+            rungs = brackets - bracket
+            count = min(len(population), math.ceil(brackets / rungs * self.eta ** (rungs - 1)))
+            rng = random.Random(None if self.seed is None else self.seed + bracket)
+            positions = sorted(rng.sample(range(len(population)), count))
+            results.extend(self._run(fn, [population[p] for p in positions], budgets[bracket:],
+                                     callback, executor, max_workers))
+        return self._sorted(results)
+
+
+def _call_with_budget(fn: Callable, budget: Budget, combo) -> Any:
+    return fn(combo, budget)
@@ -0,0 +1,117 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Set
+
+
+class ResultStore:
+    """
+    Results for combinations in a local SQLite file, by a key for the combination's config (see Sweeper.combination_key)
+    Use with Sweeper.map(fn, cache=store) to only run the combinations without a result yet,
+    e.g. after adding a value to a sweep only the new combinations run
+
+    path - SQLite file, created if it doesn't exist.  ":memory:" for a store that isn't saved
+    batch_size - number of results to write at a time
+    flush_seconds - write the results waiting to be written after this many seconds
+
+    Results are pickled.  Writes wait in memory and are written in one transaction per batch,
+    so thousands of results per second don't wait on the disk.  Results waiting to be written are still found.
+    Call flush() or close() (or use a with block) to make sure everything is written.
+    """
+
+    # SQLite allows 999 parameters per statement in older versions
+    _MAX_PARAMETERS = 900
+
+    def __init__(self, path: str, batch_size: int = 1000, flush_seconds: float = 5.0):
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        # used from the thread that consumes the map results, not always the one that opened it
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result BLOB NOT NULL)")
+        self._connection.commit()
+        # pickled results by key waiting to be written
+        self._pending: Dict[str, bytes] = {}
+        self._last_flush = time.monotonic()
+
+    def __len__(self) -> int:
+        self.flush()
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def __contains__(self, key: str) -> bool:
+        return len(self.contains_many([key])) == 1
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.get_many([key]).get(key, default)
+
+    def contains_many(self, keys: Iterable[str]) -> Set[str]:
+        """
+        The keys that have a result
+        """
+        return set(self._select(keys, "key").keys())
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Results by key for the keys that have a result
+        """
+        return {key: pickle.loads(blob) for key, blob in self._select(keys, "key, result").items()}
+
+    def put(self, key: str, result: Any):
+        blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._pending[key] = blob
+            flush = len(self._pending) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_seconds
+        if flush:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the results waiting to be written in one transaction
+        """
+        with self._lock:
+            if len(self._pending):
+                with self._connection:
+                    self._connection.executemany(
+                        "INSERT OR REPLACE INTO results (key, result) VALUES (?, ?)", self._pending.items())
+                self._pending = {}
+            self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self._connection.close()
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _select(self, keys: Iterable[str], columns: str) -> Dict[str, Any]:
+        # rows by key for the keys in the store, checking the results waiting to be written first
+        found = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                blob = self._pending.get(key)
+                if blob is not None:
+                    found[key] = blob
+                else:
+                    missing.append(key)
+            for start in range(0, len(missing), ResultStore._MAX_PARAMETERS):
+                batch = missing[start:start + ResultStore._MAX_PARAMETERS]
+                rows = self._connection.execute(
+                    f"SELECT {columns} FROM results WHERE key IN ({', '.join('?' * len(batch))})", batch)
+                for row in rows:
+                    found[row[0]] = row[1] if len(row) > 1 else None
+        return found
@@ -0,0 +1,69 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Sequence, Tuple
+
+
+async def aiter_combinations(sweeper, indices: Sequence[int]) -> AsyncIterator:
+    """
+    Async iterator over the combinations for the indices
+    """
+    for i in indices:
+        yield sweeper.combination(i)
+        # let other tasks run between combinations
+        await asyncio.sleep(0)
+
+
+async def amap_combinations(sweeper,
+                            coro_fn: Callable[[Any], Awaitable],
+                            indices: Sequence[int],
+                            concurrency: int,
+                            ordered: bool) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Await coro_fn for each combination with at most concurrency calls running at once and yield (index, result)
+
+    Combinations are only materialized when a call can start, so a slow consumer holds back new calls.
+    If a call fails, all outstanding calls are cancelled and the error is raised.
+    For ordered results, completed results wait for the earlier ones,
+    and no more calls start while too many are waiting.
+    """
+    it = iter(indices)
+    pending = set()
+    # ordered results waiting on earlier ones by position
+    buffered = {}
+    next_position = 0
+    position = 0
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency and len(pending) + len(buffered) < concurrency * 2:
+                i = next(it, None)
+                if i is None:
+                    exhausted = True
+                    break
+                pending.add(asyncio.ensure_future(
+                    _call(coro_fn, sweeper.combination(i), i, position)))
+                position += 1
+            if not len(pending):
+                break
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, result, task_position = task.result()
+                if ordered:
+                    buffered[task_position] = (index, result)
+                else:
+                    yield index, result
+            while next_position in buffered:
+                yield buffered.pop(next_position)
+                next_position += 1
+    finally:
+        for task in pending:
+            task.cancel()
+        if len(pending):
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _call(coro_fn: Callable[[Any], Awaitable], combo, index: int, position: int):
+    return index, await coro_fn(combo), position
@@ -0,0 +1,71 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+from array import array
+from typing import Any, Dict, List
+
+
+class SweepBatch:
+    """
+    A batch of consecutive combinations as columns, one per sweep object name, without a config per combination
+    For vectorized code, e.g. numpy.frombuffer(batch.value_indices["strategy.min"], dtype=numpy.int32)
+
+    start - global index of the first combination in the batch
+    indices - global indices of the combinations in the batch
+    value_indices - array of value indices for each sweep by object name, -1 where the sweep isn't in the combination,
+                    e.g. a nested sweep under another value of its parent sweep.
+                    When the same name is under different values of a sweep, the index is into the values
+                    of whichever one is in the combination
+
+    A batch only has combinations from one config
+    """
+
+    def __init__(self, start: int, size: int, nodes: List, columns: List[array]):
+        self.start = start
+        self._size = size
+        self._columns = columns
+        # nodes by object name, more than one when the same name is under different values of a sweep
+        self._nodes: Dict[str, List] = {}
+        for node in nodes:
+            self._nodes.setdefault(node.object_name, []).append(node)
+        self.value_indices: Dict[str, array] = {}
+        for object_name, named_nodes in self._nodes.items():
+            merged = columns[named_nodes[0].column]
+            if len(named_nodes) > 1:
+                # only one of them is in each combination
+                merged = array('i', merged)
+                for node in named_nodes[1:]:
+                    for i, v in enumerate(columns[node.column]):
+                        if v >= 0:
+                            merged[i] = v
+            self.value_indices[object_name] = merged
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def indices(self) -> range:
+        return range(self.start, self.start + len(self))
+
+    def mask(self, object_name: str) -> array:
+        """
+        1 where the sweep is in the combination, 0 where it isn't, as bytes for numpy.frombuffer(..., dtype=bool)
+        """
+        return array('b', [1 if v >= 0 else 0 for v in self.value_indices[object_name]])
+
+    def values(self, object_name: str, default: Any = None) -> List[Any]:
+        """
+        The value of the sweep for each combination, default where the sweep isn't in the combination
+        """
+        nodes = self._nodes[object_name]
+        if len(nodes) == 1:
+            node_values = nodes[0].values
+            return [node_values[v] if v >= 0 else default for v in self.value_indices[object_name]]
+        # the value indices are for whichever of the nodes is in the combination
+        values = [default] * len(self)
+        for node in nodes:
+            node_values = node.values
+            for i, v in enumerate(self._columns[node.column]):
+                if v >= 0:
+                    values[i] = node_values[v]
+        return values
@@ -1,23 +1,78 @@
 # SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
 # SPDX-License-Identifier: MIT
 
-from typing import Any
+from typing import Any, Dict, List
 
 
 class SweepCombination:
     """
     A config with values set for a combination of sweep items defined in the original config
 
-    description - what values where set for this combination
+    description - what values where set for this combination.  Built on first use
     config - the config with all sweep items replaced with values
     index - a unique index across all the sweep combinations
+    assignments - the value index for each sweep item by object name, e.g. {"strategy.min": 2}
+    assigned_values - the value for each sweep item by object name, e.g. {"strategy.min": 30}
+    changed_paths - object names of the sweep items with a different value than the combination before it
+                    in the same config, all of them for the first combination.
+                    Parts of a config not under a changed path are the same as the combination before it.
     """
 
-    def __init__(self, description: str, config: Any, index: int):
+    def __init__(self, description: str, config: Any, index: int, dag=None, row=None, previous_row=None):
         # description of the sweep values used in this combination
-        self.description = description
+        # None to build it from the dag and the row of value indices when needed
+        self._description = description
         self.config = config
         self.index = index
+        self._dag = dag
+        self._row = row
+        self._previous_row = previous_row
+        self._assignments = None
+        self._assigned_values = None
+        self._changed_paths = None
+
+    @property
+    def description(self) -> str:
+        if self._description is None:
+            self._description = "\n".join(self._dag.describe(self._row))
+        return self._description
+
+    @description.setter
+    def description(self, description: str):
+        self._description = description
+
+    @property
+    def assignments(self) -> Dict[str, int]:
+        if self._assignments is None:
+            self._assignments = self._dag.assignments(
+                self._row) if self._dag is not None else {}
+        return self._assignments
+
+    @property
+    def assigned_values(self) -> Dict[str, Any]:
+        if self._assigned_values is None:
+            self._assigned_values = self._dag.assigned_values(
+                self._row) if self._dag is not None else {}
+        return self._assigned_values
+
+    @property
+    def changed_paths(self) -> List[str]:
+        if self._changed_paths is None:
+            self._changed_paths = self._dag.changed_paths(
+                self._row, self._previous_row) if self._dag is not None else []
+        return self._changed_paths
+
+    def __getstate__(self):
+        # resolve everything from the dag so the whole dag isn't taken along, e.g. to another process
+        state = dict(self.__dict__)
+        state["_description"] = self.description
+        state["_assignments"] = self.assignments
+        state["_assigned_values"] = self.assigned_values
+        state["_changed_paths"] = self.changed_paths
+        state["_dag"] = None
+        state["_row"] = None
+        state["_previous_row"] = None
+        return state
 
     def __repr__(self) -> str:
         return f"SweepCombination(index={self.index} description={self.description}, config={self.config})"
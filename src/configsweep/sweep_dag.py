@@ -1,60 +1,107 @@
 # SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
 # SPDX-License-Identifier: MIT
 
+import time
+from array import array
 from enum import Enum
-from typing import Any, Union, List, Tuple
-import itertools
+from typing import Any, Dict, Union, List, Sequence, Tuple
+from bisect import bisect_right
+from copy import copy
+from configsweep.constraint import Constraint
 from configsweep.sweep import Sweep
-from dataclasses import is_dataclass
+from dataclasses import fields, is_dataclass
 from operator import attrgetter
 
 
 class SweepDag:
     """
     A dag of sweep items from the given config
-    Each node in the dag has a list of combinations ot process
-    Thus, the root node has all the combionations to process for the entire config
+    Each node in the dag has the number of combinations to process
+    Thus, the root node has the number of combionations to process for the entire config
 
     First the DAG nodes are built
     Second, each child node is sorted according to the priority
-    Third, the combinations are built in the priorty order
+    Third, the combination counts are built in the priorty order
+    Fourth, each node gets a column in the priority order
+    Fifth, if there are constraints, the ranges of valid combinations are found
+    Sixth, if not lazy, the combinations are built in the priorty order
+
+    A combination is a row with the value index for each node's column, -1 when the node isn't used,
+    e.g. a sweep nested in a value of another sweep that isn't the current value.
+
+    When lazy, no combinations are stored.  Each node only keeps the number of
+    sub combinations per value index and a combination is decoded on demand
+    from its index with mixed-radix arithmetic (see row).
+    Memory and build time are then proportional to the number of sweep nodes
+    rather than the number of combinations.
+    Otherwise, all the rows are kept in one contiguous integer array.
+
+    With constraints, the combinations left out are skipped over by keeping the sorted ranges of
+    the valid combinations in the full product.  The combo index is then the index among the valid ones.
 
     NOTE: this is constantly modifying the config passed in 
     and keeps references to objects in the config passed in
     """
 
-    def __init__(self, config: Any):
+    def __init__(self, config: Any, lazy: bool = True, constraints: List[Constraint] = None):
         self.config = config
+        self.lazy = lazy
+        self.constraints: List[Constraint] = list(constraints or [])
+        # containers with a sweep below them by id (holds a reference so the id stays valid)
+        self.sweep_containers = {}
         # need a single value for combo algorithm
         self.root_node = SweepDag.Node(Sweep([None]))
-        self.build_nodes(self.root_node, 0, "", None, None, None, None, config)
+        self.build_nodes(config)
         self.sort_priority(self.root_node)
-        self.build_combos(self.root_node)
+        self.build_counts(self.root_node)
+        # sweep nodes (not the root) in column order
+        self.nodes: List[SweepDag.Node] = []
+        self.build_columns(self.root_node)
+        self.width = len(self.nodes)
+        # valid combinations as [start, stop) ranges of the full product and
+        # the number of valid combinations before each range, None when nothing is left out
+        self._valid_starts = None
+        self._valid_stops = None
+        self._valid_ranks = None
+        self._count = self.root_node.count
+        if len(self.constraints):
+            self.build_valid_ranges()
+        self.rows = None
+        # description by (column, value index), built on first use
+        self._descriptions: Dict[Tuple[int, int], str] = {}
+        # row currently applied to the config and its combo index if known
+        self._applied_row = None
+        self._applied_index = None
+        # optional SweepStats to time describe
+        self.stats = None
+        if not lazy:
+            self.build_rows()
 
-    class ComboElement:
-        def __init__(self, node, value_index: int, next=None):
-            self.node: SweepDag.Node = node
-            self.value_index: int = value_index
-            self.next: SweepDag.ComboElement = next
+    def __getstate__(self):
+        # pickled with the sweep objects in place, see apply_sweep_to_config
+        state = dict(self.__dict__)
+        state["stats"] = None
+        state["_applied_row"] = None
+        state["_applied_index"] = None
+        return state
 
-        def value(self):
-            return self.node.values[self.value_index]
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # the containers have new ids after unpickling
+        self.sweep_containers = {id(container): container for container in self.sweep_containers.values()}
 
-        def value_description(self, with_name: bool = False):
-            # build description for sweep item replaced
-            value = self.value()
-            value_desc = _short_value_description(value)
-            if not value_desc:
-                value_desc = f"<complex_value>[{self.value_index}]"
-            return f"{self.node.object_name}={value_desc}" if with_name else value_desc
-
-        def last_value_description(self, with_name: bool = False):
-            last = self
-            while last.next is not None:
-                last = last.next
-            return last.value_description(with_name)
+    @property
+    def count(self) -> int:
+        """
+        Total number of combinations for the config, not counting the ones left out by constraints
+        """
+        return self._count
 
     class Node:
+        __slots__ = ('sweep', 'parent', 'parent_value_index', 'object_name', 'attribute_name', 'key_name',
+                     'list_index', 'object', 'path', 'priority', 'values', 'child_nodes', 'value_child_nodes',
+                     'counts', 'offsets', 'count', 'column', 'end_column')
+
         def __init__(self,
                      sweep: Sweep,
                      parent=None,
@@ -63,7 +110,8 @@ class SweepDag:
                      attribute_name: str = None,
                      key_name: str = None,
                      list_index: int = None,
-                     object=None):
+                     object=None,
+                     path: Tuple = ()):
             self.sweep = sweep  # original sweep item in the config
             self.parent: SweepDag.Node = parent
             self.parent_value_index: int = parent_value_index
@@ -72,6 +120,8 @@ class SweepDag:
             self.key_name = key_name  # also indicates obj is a dict
             self.list_index = list_index  # also indicates obj is a list
             self.object = object
+            # steps from the root of the config to the sweep as (attribute_name, key_name, list_index)
+            self.path: Tuple = path
             self.priority = sweep.priority
             # sweep node values to sweep through must be a non-empty list
             if sweep.values is None or not isinstance(sweep.values, list) or not len(sweep.values):
@@ -79,53 +129,130 @@ class SweepDag:
                     f"{object_name} Sweep values must contain a non-empty list")
             self.values = sweep.values
             self.child_nodes: List[SweepDag.Node] = []
-            self.combos: List[List[SweepDag.ComboElement]] = []
+            # children grouped by the value index they belong to, in priority order
+            self.value_child_nodes: List[List[SweepDag.Node]] = []
+            # number of sub combinations for each value index
+            # offsets[i] is the index of the first combination for value index i
+            self.counts: List[int] = []
+            self.offsets: List[int] = []
+            self.count: int = 0
+            # column for the node in a combination row
+            # nodes below it are in the columns up to end_column
+            self.column: int = -1
+            self.end_column: int = -1
 
-    def build_nodes(self, parent, parent_value_index: int, object_name: str, attribute_name: str, key_name: str, list_index: int, object, value):
+        def value_description(self, value_index: int, with_name: bool = False):
+            # build description for sweep item replaced
+            value = self.values[value_index]
+            # a value holding nested sweeps reads differently for each of their values,
+            # which are described after it anyway
+            value_desc = None
+            if not len(self.value_child_nodes[value_index]):
+                value_desc = _short_value_description(value)
+            if not value_desc:
+                value_desc = f"<complex_value>[{value_index}]"
+            return f"{self.object_name}={value_desc}" if with_name else value_desc
+
+    def build_nodes(self, config: Any):
         """
         Pull out the DAG of sweep nodes from config file
         Traverse through all dicts, lists and dataclasses in the config to extract the sweep node DAG
         The DAG only contains sweep nodes with references back to the original config
+
+        The walk uses a stack rather than recursion, so deep configs don't hit the recursion limit
+        Values that can't hold a sweep (numbers, strings, bytes, arrays, ...) are skipped by type
+        without building anything, lists, tuples and sets of them as a whole,
+        and names and paths are only built for the sweeps found.
+        Dataclass field names are kept for each type.
+
+        Also keeps track of the containers that have a sweep somewhere below them (see copy_config)
         """
-        if isinstance(value, Sweep):
-            # check if came from a tuple/set.  Can't swap out values in that
-            # set/tuple can't contain a sweep object (not hashable), so this should never come up in theory
-            if isinstance(object, (set, tuple, frozenset)):
-                raise TypeError(
-                    f"Can't sweep items in a tuple or set.  See if item {object_name} can be converted to a list.")
-
-            node = SweepDag.Node(value, parent, parent_value_index,
-                                 object_name, attribute_name, key_name, list_index, object)
-            parent.child_nodes.append(node)
-            # support sweep within sweep (could be nested right away or later on)
-            # cut out current sweep node, set it as the parent and use it's values to then proceed as normal
-            parent = node
-            value = value.values
-            for idx, next_value in enumerate(value):
-                if isinstance(next_value, Sweep):
+        # one frame per container or sweep being walked, so memory grows with the depth, not the size
+        # (children left, parent node, parent value index, object, step kind, link of the object, on path)
+        # step kind is attribute, key, index or a value of a sweep, which takes the place of the sweep
+        # link is (parent link, step kind, step name, object) for the steps from the root to a value
+        stack = [(iter(((None, config),)), self.root_node,
+                  0, None, None, None, False)]
+        # containers being walked, to catch a reference cycle
+        on_path = set()
+        while stack:
+            children, parent, parent_value_index, object, kind, object_link, is_on_path = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                if is_on_path:
+                    on_path.discard(id(object))
+                continue
+
+            name, value = child
+            if kind is None:
+                link = None
+            elif kind == _VALUE:
+                link = object_link
+                parent_value_index = name
+            else:
+                link = (object_link, kind, name, object)
+            value_kind = _kind(type(value))
+
+            if value_kind == _SWEEP:
+                path, object_name = _path(link)
+                if kind == _VALUE:
                     raise TypeError((f"{object_name} Sweep value can't be another sweep directly.  "
                                      "Use one Sweep item with a list of merged values or make an array to sweep an element in the array"))
-                self.build_nodes(parent, idx, object_name,
-                                 None, None, idx, value, next_value)
-        elif isinstance(value, dict):
-            for name, next_value in value.items():
-                next_object_name = f"{object_name}.{name}" if len(
-                    object_name) else name
-                self.build_nodes(parent, parent_value_index,
-                                 next_object_name, None, name, None, value, next_value)
-        elif is_dataclass(value):
-            for name, next_value in vars(value).items():
-                # skip dunders
-                if not name.startswith('__'):
-                    next_object_name = f"{object_name}.{name}" if len(
-                        object_name) else name
-                    self.build_nodes(
-                        parent, parent_value_index, next_object_name, name, None, None, value, next_value)
-        elif isinstance(value, (list, set, tuple, frozenset)):
-            # it's ok to go through tuple/set, but not to sweep items inside a tuple or set
-            for idx, next_value in enumerate(value):
-                self.build_nodes(parent, parent_value_index,
-                                 f"{object_name}[{idx}]", None, None, idx, value, next_value)
+                # check if came from a tuple/set.  Can't swap out values in that
+                # set/tuple can't contain a sweep object (not hashable), so this should never come up in theory
+                if isinstance(object, (set, tuple, frozenset)):
+                    raise TypeError(
+                        f"Can't sweep items in a tuple or set.  See if item {object_name} can be converted to a list.")
+
+                node = SweepDag.Node(value, parent, parent_value_index, object_name,
+                                     name if kind == _ATTRIBUTE else None,
+                                     name if kind == _KEY else None,
+                                     name if kind == _INDEX else None,
+                                     object, path)
+                parent.child_nodes.append(node)
+                self._mark_sweep_containers(link)
+                # support sweep within sweep (could be nested right away or later on)
+                # the sweep node is the parent for its values and each value takes the place of the sweep
+                stack.append((enumerate(value.values), node, None,
+                             value.values, _VALUE, link, False))
+                continue
+            if value_kind == _LEAF:
+                continue
+
+            if value_kind == _DICT:
+                child_kind = _KEY
+                items = value.items()
+            elif value_kind == _DATACLASS:
+                child_kind = _ATTRIBUTE
+                items = _attribute_items(value)
+            else:
+                # skip a list, tuple or set of values that can't hold a sweep as a whole,
+                # e.g. a list of 1M floats only has its distinct types checked
+                if all(_kind(t) == _LEAF for t in set(map(type, value))):
+                    continue
+                # it's ok to go through tuple/set, but not to sweep items inside a tuple or set
+                child_kind = _INDEX
+                items = enumerate(value)
+
+            if id(value) in on_path:
+                _, object_name = _path(link)
+                raise ValueError(
+                    f"Can't sweep a config with a reference cycle at {object_name}")
+            on_path.add(id(value))
+
+            # skip children that can't hold a sweep
+            kinds = _type_kinds
+            children = ((k, v) for k, v in items
+                        if kinds.get(type(v)) != _LEAF and _kind(type(v)) != _LEAF)
+            stack.append((children, parent, parent_value_index,
+                         value, child_kind, link, True))
+
+    def _mark_sweep_containers(self, link):
+        # every object on the path to a sweep has a sweep below it
+        while link is not None:
+            link, _, _, object = link
+            self.sweep_containers[id(object)] = object
 
     def sort_priority(self, node):
         """
@@ -137,101 +264,508 @@ class SweepDag:
                 self.sort_priority(child)
             node.child_nodes.sort(key=attrgetter('priority'), reverse=True)
 
-    def build_combos(self, node):
+    def build_counts(self, node):
+        """
+        Count the combinations for each node in the dag with children already sorted correctly
+
+        A value index with child sweeps has the product of the child counts as combinations
+        A value index without child sweeps is a single combination
         """
-        Builds the combinations for each node in the dag with children already sorted correctly
+        node.value_child_nodes = [[] for _ in node.values]
+        for child in node.child_nodes:
+            self.build_counts(child)
+            node.value_child_nodes[child.parent_value_index].append(child)
 
-        Handle nested sweeps
-        If a sweep index has child sweeps then take the product of those children
-        Also keep a list for the combo element to know all the nested replacements to make down stream
+        node.counts = []
+        node.offsets = []
+        node.count = 0
+        for children in node.value_child_nodes:
+            value_count = 1
+            for child in children:
+                value_count *= child.count
+            node.offsets.append(node.count)
+            node.counts.append(value_count)
+            node.count += value_count
+
+    def build_columns(self, node):
+        """
+        Give each node a column in pre-order with the children sorted by priority
+        So nodes are in the same order as they are applied and described in a combination
+        """
+        for child in node.child_nodes:
+            child.column = len(self.nodes)
+            self.nodes.append(child)
+            self.build_columns(child)
+            child.end_column = len(self.nodes)
 
-        The base case is there are no kids, so just use the sweep values as the combos
+    def build_valid_ranges(self):
         """
-        if not len(node.child_nodes):
-            # base case optimized for when no kids
-            # value is the combo
-            node.combos = [[SweepDag.ComboElement(
-                node, i)] for i in range(len(node.values))]
+        Find the ranges of the combinations that pass all the constraints without going through each one
+
+        The nodes are in pre-order, which is also the order of the digits from most to least significant.
+        So assigning values in column order narrows down to a contiguous range of combinations at each step,
+        and a constraint that fails as soon as its sweeps have values leaves out the whole range.
+        """
+        checks = []
+        for constraint in self.constraints:
+            path_nodes = [[node for node in self.nodes if node.object_name == path]
+                          for path in constraint.paths]
+            # a constraint on sweeps not in this config never applies
+            if all(len(nodes) for nodes in path_nodes):
+                checks.append((constraint.predicate, path_nodes))
+
+        self._valid_starts = []
+        self._valid_stops = []
+        row = array('i', [-1]) * self.width
+        # nodes left to assign with the size of their digit, next one last
+        pending = [(child, 1) for child in reversed(self.root_node.value_child_nodes[0])]
+        stride = 1
+        for i in range(len(pending)):
+            node, _ = pending[i]
+            pending[i] = (node, stride)
+            stride *= node.count
+        self._find_valid_ranges(pending, 0, self.root_node.count, checks, row)
+
+        self._valid_ranks = []
+        self._count = 0
+        for start, stop in zip(self._valid_starts, self._valid_stops):
+            self._valid_ranks.append(self._count)
+            self._count += stop - start
+
+    def _find_valid_ranges(self, pending: List, start: int, size: int, checks: List, row: array):
+        # the combinations from start to start + size have the values in the row so far
+        if not len(checks):
+            self._add_valid_range(start, start + size)
             return
+        if not len(pending):
+            return
+
+        node, stride = pending.pop()
+        for value_index in range(len(node.values)):
+            row[node.column] = value_index
+            unchecked = []
+            passed = True
+            for check in checks:
+                result = self._check(check, row)
+                if result is None:
+                    unchecked.append(check)
+                elif not result:
+                    passed = False
+                    break
+            if not passed:
+                continue
+            children = node.value_child_nodes[value_index]
+            child_stride = stride
+            for child in reversed(children):
+                pending.append((child, child_stride))
+                child_stride *= child.count
+            self._find_valid_ranges(pending, start + node.offsets[value_index] * stride,
+                                    node.counts[value_index] * stride, unchecked, row)
+            del pending[len(pending) - len(children):]
+        row[node.column] = -1
+        pending.append((node, stride))
+
+    def _check(self, check: Tuple, row: array):
+        # True or False for the constraint, or None if its sweeps don't all have values yet
+        predicate, path_nodes = check
+        values = []
+        for nodes in path_nodes:
+            found = False
+            for node in nodes:
+                value_index = self._value_index(node, row)
+                if value_index == _UNASSIGNED:
+                    return None
+                if value_index >= 0:
+                    values.append(node.values[value_index])
+                    found = True
+            if not found:
+                # not in the combination, so the constraint doesn't apply
+                return True
+        return bool(predicate(*values))
+
+    def _value_index(self, node, row: array) -> int:
+        # value index of the node in the partly assigned row, -1 if it isn't used or _UNASSIGNED
+        value_index = row[node.column]
+        if value_index >= 0:
+            return value_index
+        if node.parent.column < 0:
+            return _UNASSIGNED
+        parent_value_index = self._value_index(node.parent, row)
+        if parent_value_index == _UNASSIGNED or parent_value_index == node.parent_value_index:
+            return _UNASSIGNED
+        return -1
+
+    def _add_valid_range(self, start: int, stop: int):
+        if len(self._valid_stops) and self._valid_stops[-1] == start:
+            self._valid_stops[-1] = stop
         else:
-            for child in node.child_nodes:
-                self.build_combos(child)
-
-            for value_index in range(len(node.values)):
-                index_had_a_child = False
-                # when child sweeps share the same parent index
-                # then take the product of those children
-                a = []
-                for child in node.child_nodes:
-                    if child.parent_value_index == value_index:
-                        sub_list = []
-                        for child_combo in child.combos:
-                            # need to replace for each child combo current element and the child element
-                            sub_list.append([SweepDag.ComboElement(
-                                node, value_index, ce) for ce in child_combo])
-                        a.append(sub_list)
-                        index_had_a_child = True
-                if index_had_a_child:
-                    p = list(itertools.product(*a))
-                    # product gives a tuple of items from each list
-                    # however, child elements will be a list of combo elements
-                    # flatten it to a list of combo elements
-                    for combo_tuple in p:
-                        flat = []
-                        for i in combo_tuple:
-                            # know it will be a plain list from the product function
-                            if isinstance(i, list):
-                                for j in i:
-                                    flat.append(j)
-                            else:
-                                flat.append(i)
-                        node.combos.append(flat)
+            self._valid_starts.append(start)
+            self._valid_stops.append(stop)
+
+    def _full_index(self, combo_index: int) -> int:
+        # index in the full product for the index among the valid combinations
+        if self._valid_starts is None:
+            return combo_index
+        i = bisect_right(self._valid_ranks, combo_index) - 1
+        return self._valid_starts[i] + combo_index - self._valid_ranks[i]
+
+    def _valid_index(self, full_index: int) -> int:
+        # number of valid combinations before the index in the full product
+        if self._valid_starts is None:
+            return full_index
+        i = bisect_right(self._valid_starts, full_index) - 1
+        if i < 0:
+            return 0
+        return self._valid_ranks[i] + min(full_index, self._valid_stops[i]) - self._valid_starts[i]
+
+    def build_rows(self):
+        """
+        Build the rows for all the combinations in one contiguous array
+        """
+        self.rows = array('i')
+        for combo_index in range(self.count):
+            self.rows.extend(self._decode_row(self._full_index(combo_index)))
+
+    def row(self, combo_index: int) -> array:
+        """
+        Get the combination row for the index in priority order
+        Lazy dags decode the row from the index, otherwise it was already built
+        """
+        if combo_index < 0 or combo_index >= self.count:
+            raise IndexError(f"combo index {combo_index} out of range")
+        if self.rows is not None:
+            row = self.rows[combo_index * self.width:(combo_index + 1) * self.width]
+            # rows memory mapped from a sweep table are a memoryview
+            return row if isinstance(row, array) else array('i', row)
+        return self._decode_row(self._full_index(combo_index))
+
+    def _decode_row(self, combo_index: int) -> array:
+        row = array('i', [-1]) * self.width
+        self._decode(self.root_node, combo_index, row)
+        return row
+
+    def _decode(self, node, combo_index: int, row: array):
+        """
+        Decode the value indices for the node and the nodes below it into the row
+
+        Values are in order, so find the value index from the offsets
+        The rest of the index is a mixed-radix number over the child sweeps for that value
+        with the first child (highest priority) as the most significant digit
+        """
+        value_index = bisect_right(node.offsets, combo_index) - 1
+        if node.column >= 0:
+            row[node.column] = value_index
+        children = node.value_child_nodes[value_index]
+        if not len(children):
+            return
+
+        remainder = combo_index - node.offsets[value_index]
+        for i in range(len(children) - 1, -1, -1):
+            remainder, digit = divmod(remainder, children[i].count)
+            self._decode(children[i], digit, row)
+
+    def point_index(self, point: Sequence[float]) -> int:
+        """
+        Combo index for a point in the unit cube with a coordinate from 0 to 1 for each column
+        The coordinate for a node picks its value weighted by the number of combos under each value,
+        so uniform points give uniform combos, nested sweeps included.
+        With constraints, a point on a combo that's left out gives None, so it can be drawn again
+        and the points that are kept are still uniform over the valid combos
+        """
+        full_index = self._point_index(self.root_node, point)
+        if self._valid_starts is not None:
+            i = bisect_right(self._valid_starts, full_index) - 1
+            if i < 0 or full_index >= self._valid_stops[i]:
+                return None
+        return self._valid_index(full_index)
+
+    def _point_index(self, node, point: Sequence[float]) -> int:
+        value_index = 0
+        if node.column >= 0:
+            position = min(int(point[node.column] * node.count), node.count - 1)
+            value_index = bisect_right(node.offsets, position) - 1
+        remainder = 0
+        for child in node.value_child_nodes[value_index]:
+            remainder = remainder * child.count + self._point_index(child, point)
+        return node.offsets[value_index] + remainder
+
+    def columns(self, start: int, stop: int) -> List[array]:
+        """
+        The value indices of each column for the combos from start to stop, -1 where the node isn't used
+        Works out each column for all the combos at once from the counts, without a row per combo
+        """
+        if start < 0 or stop > self.count or start > stop:
+            raise IndexError(f"combo range {start} to {stop} out of range")
+        columns = [None] * self.width
+        self._fill_columns(self.root_node, [self._full_index(i) for i in range(start, stop)], columns)
+        return columns
+
+    def _fill_columns(self, node, positions: List[int], columns: List[array]):
+        # positions are the index in the node's own combos for each combo, -1 where the node isn't used
+        offsets = node.offsets
+        if node.column >= 0:
+            value_indices = [bisect_right(offsets, p) - 1 if p >= 0 else -1 for p in positions]
+            columns[node.column] = array('i', value_indices)
+        else:
+            value_indices = [0] * len(positions)
+        used = set(value_indices)
+        for value_index, children in enumerate(node.value_child_nodes):
+            if not len(children) or value_index not in used:
+                continue
+            offset = offsets[value_index]
+            remainders = [p - offset if v == value_index else -1 for p, v in zip(positions, value_indices)]
+            # mixed-radix digits, first child most significant
+            stride = node.counts[value_index]
+            for child in children:
+                stride //= child.count
+                count = child.count
+                self._fill_columns(child, [(r // stride) % count if r >= 0 else -1 for r in remainders], columns)
+        # nodes under values that no combo in the range uses
+        for child in node.child_nodes:
+            if columns[child.column] is None:
+                for column in range(child.column, child.end_column):
+                    columns[column] = array('i', [-1]) * len(positions)
+
+    def priority_groups(self, levels: int = 1) -> List[Tuple[int, int]]:
+        """
+        Ranges of combo indices (start, stop) that share the same value for the highest priority sweep
+
+        The highest priority top level sweep is the slowest changing in the combos,
+        so each of its values covers one contiguous range of combos
+        Values with all their combos left out by constraints don't have a range
+
+        levels - share the values of this many sweeps in column order (priority order, nested sweeps after
+                 the value they are under), e.g. 2 splits each group by the value of the next sweep
+        """
+        top_nodes = self.root_node.value_child_nodes[0]
+        if not len(top_nodes):
+            return [(0, self.count)] if self.count else []
+        first = top_nodes[0]
+        rest = 1
+        for node in top_nodes[1:]:
+            rest *= node.count
+        groups = [(self._valid_index(offset * rest), self._valid_index((offset + count) * rest))
+                  for offset, count in zip(first.offsets, first.counts)]
+        groups = [(start, stop) for start, stop in groups if start < stop]
+        for column in range(1, min(levels, self.width)):
+            groups = [split for start, stop in groups for split in self._split_group(start, stop, column)]
+        return groups
+
+    def _split_group(self, start: int, stop: int, column: int) -> List[Tuple[int, int]]:
+        # the combos in a group share the values of the columns before this one, which include the parent of
+        # the column's node, so the column is either -1 for the whole group or goes up through it (the next digit)
+        # and each value's range is found with a binary search
+        splits = []
+        while start < stop:
+            value_index = self.row(start)[column]
+            low, high = start + 1, stop
+            while low < high:
+                middle = (low + high) // 2
+                if self.row(middle)[column] == value_index:
+                    low = middle + 1
                 else:
-                    # base case - append the value as the combo
-                    node.combos.append(
-                        [SweepDag.ComboElement(node, value_index)])
+                    high = middle
+            splits.append((start, low))
+            start = low
+        return splits
+
+    def last_combo_index(self, node, value_indices: dict) -> int:
+        """
+        The last combo index where the node and the given nodes below it have the value indices
+        With constraints, it's the last valid combo at or before the last one in the full product,
+        which can be a little later than the actual last one with the values
+
+        value_indices - value index by node for the node and any nodes below it, e.g. its active child nodes
+        """
+        fixed = dict(value_indices)
+        # the node only shows up with its parents set to the value it is under
+        while node.parent is not None:
+            fixed[node.parent] = node.parent_value_index
+            node = node.parent
+        return self._valid_index(self._last_combo_index(self.root_node, fixed) + 1) - 1
+
+    def _last_combo_index(self, node, fixed: dict) -> int:
+        # the value is the most significant digit, so use the last value unless it's fixed
+        # then the same for each child as the next digits in the mixed-radix number
+        value_index = fixed.get(node, len(node.values) - 1)
+        remainder = 0
+        for child in node.value_child_nodes[value_index]:
+            remainder = remainder * child.count + self._last_combo_index(child, fixed)
+        return node.offsets[value_index] + remainder
 
     def apply_combo_to_config(self, combo_index: int) -> List[str]:
         """
         Apply all the values in the combo to the config
+        Returns the description of the combo
+        """
+        row, _ = self.apply_combo(combo_index)
+        return self.describe(row)
+
+    def apply_combo(self, combo_index: int) -> Tuple[array, array]:
+        """
+        Apply all the values in the combo to the config
+        Returns the row for the combo and the row for the combo before it in priority order (None for the first)
+        """
+        if self._applied_index is not None and self._applied_index == combo_index - 1:
+            previous_row = self._applied_row
+        else:
+            previous_row = self.row(combo_index - 1) if combo_index > 0 else None
+        row = self.row(combo_index)
+        self.apply_row(row)
+        self._applied_index = combo_index
+        return row, previous_row
+
+    def apply_row(self, row: array):
+        """
+        Apply all the values in the combination row to the config
         So we go through the config and swap out all the right values in all the right places
 
-        Each element in the combo has a reference to the config to replace 
-        and a list sub elements to replace as well
+        Only the values that changed since the last row applied are set.
+        In priority order, consecutive combos mostly differ in the lowest priority sweeps.
+        A nested sweep that wasn't in the last row is always set since its value could have been
+        set for another combo in the meantime.
+
+        Nodes are in pre-order, so a nested sweep is applied after the value it is in
+        """
+        applied_row = self._applied_row
+        for node in self.nodes:
+            value_index = row[node.column]
+            if value_index < 0 or (applied_row is not None and applied_row[node.column] == value_index):
+                continue
+            object = node.object
+            if object is not None:
+                value = node.values[value_index]
+                if node.attribute_name is not None:
+                    setattr(object, node.attribute_name, value)
+                elif node.key_name is not None:
+                    object[node.key_name] = value
+                else:
+                    object[node.list_index] = value
+        self._applied_row = row
+        self._applied_index = None
+
+    def changed_paths(self, row: array, previous_row: array) -> List[str]:
+        """
+        Object names of the sweeps in the row with a different value than the previous row
+        All the sweeps in the row when there isn't a previous row
+        """
+        return [node.object_name for node in self.nodes
+                if row[node.column] >= 0 and (previous_row is None or previous_row[node.column] != row[node.column])]
+
+    def describe(self, row: array) -> List[str]:
         """
-        combo = self.root_node.combos[combo_index]
+        A description for each chain of nested sweeps in the combination row down to the last one
+        The description of each node value is only built once
+        """
+        if self.stats is not None:
+            start = time.perf_counter()
         description_list = []
-        for element in combo:
+        for node in self.nodes:
+            value_index = row[node.column]
+            if value_index < 0 or len(node.value_child_nodes[value_index]):
+                continue
+            # last in a chain of nested sweeps, describe the whole chain
             element_description_list = []
-            # make all replacements down the chain for nested sweeps
-            while element is not None:
-                node = element.node
-                value = node.values[element.value_index]
-                object = node.object
-                if object is not None:
-                    if node.attribute_name is not None:
-                        setattr(object, node.attribute_name, value)
-                    elif node.key_name is not None:
-                        object[node.key_name] = value
-                    else:
-                        object[node.list_index] = value
-                    element_description_list.append(element.value_description(with_name=True))
-                    # if element.next is None:
-                    #     # use last element in chain for the description
-                    #     element_description_list.append(
-                    #         element.value_description(with_name=True))
-                    # else:
-                    #     element_description_list.append(node.object_name)
-                element = element.next
-            description_list.append(' & '.join(element_description_list))
+            while node.column >= 0:
+                if node.object is not None:
+                    element_description_list.append(
+                        self._value_description(node, row[node.column]))
+                node = node.parent
+            description_list.append(
+                ' & '.join(reversed(element_description_list)))
+        if self.stats is not None:
+            self.stats.record("describe", time.perf_counter() - start)
         return description_list
 
+    def _value_description(self, node, value_index: int) -> str:
+        key = (node.column, value_index)
+        description = self._descriptions.get(key)
+        if description is None:
+            description = node.value_description(value_index, with_name=True)
+            self._descriptions[key] = description
+        return description
+
+    def assignments(self, row: array) -> Dict[str, int]:
+        """
+        The value index for each sweep in the combination row by object name
+        """
+        return {node.object_name: row[node.column] for node in self.nodes if row[node.column] >= 0}
+
+    def assigned_values(self, row: array) -> Dict[str, Any]:
+        """
+        The value for each sweep in the combination row by object name
+        """
+        return {node.object_name: node.values[row[node.column]] for node in self.nodes if row[node.column] >= 0}
+
+    def get_value(self, config: Any, node) -> Any:
+        """
+        Get the value at the node's location in a config with the same structure, e.g. a copy of the config
+        """
+        value = config
+        for attribute_name, key_name, list_index in node.path:
+            if attribute_name is not None:
+                value = getattr(value, attribute_name)
+            elif key_name is not None:
+                value = value[key_name]
+            else:
+                value = value[list_index]
+        return value
+
+    def copy_config(self, memo: dict = None) -> Any:
+        """
+        Copy the config with the current combo applied, only copying what a sweep can change
+
+        Containers (dicts, lists, tuples, dataclasses) on the path from the root to a sweep are shallow copied
+        Everything else, including the sweep values themselves, is shared with the config
+        and with every other copy made.  Treat the shared parts as read-only.
+
+        memo - optional dict that gets the copied containers by the id of the original
+        """
+        return self._copy_shared(self.config, {} if memo is None else memo)
+
+    def _copy_shared(self, value, memo: dict):
+        if id(value) not in self.sweep_containers:
+            return value
+        # keep shared references shared like deepcopy does
+        copied = memo.get(id(value))
+        if copied is not None:
+            return copied
+
+        if isinstance(value, (tuple, set, frozenset)):
+            items = [self._copy_shared(v, memo) for v in value]
+            if hasattr(value, '_fields'):
+                # named tuple
+                copied = type(value)(*items)
+            else:
+                copied = type(value)(items)
+            memo[id(value)] = copied
+            return copied
+
+        copied = copy(value)
+        memo[id(value)] = copied
+        if isinstance(value, dict):
+            for name, next_value in value.items():
+                if id(next_value) in self.sweep_containers:
+                    copied[name] = self._copy_shared(next_value, memo)
+        elif isinstance(value, list):
+            for idx, next_value in enumerate(value):
+                if id(next_value) in self.sweep_containers:
+                    copied[idx] = self._copy_shared(next_value, memo)
+        else:
+            # dataclass, could be frozen
+            for name, next_value in _attribute_items(value):
+                if id(next_value) in self.sweep_containers:
+                    object.__setattr__(copied, name, self._copy_shared(next_value, memo))
+        return copied
+
     def apply_sweep_to_config(self):
         """
         Put the sweep objects back into the config
         i.e. put it back to how it was originally
         """
         self._apply_sweep(self.root_node)
+        self._applied_row = None
+        self._applied_index = None
 
     def _apply_sweep(self, node):
         if node is None:
@@ -272,3 +806,87 @@ def _short_value_description(value: Any) -> Union[str, None]:
             description = None  # nevermind, we tried
 
     return description
+
+
+# kinds of values when walking the config
+_LEAF = 0
+_SWEEP = 1
+_DICT = 2
+_DATACLASS = 3
+_SEQUENCE = 4
+# kinds of steps from a value to the value in it
+_ATTRIBUTE = 'a'
+_KEY = 'k'
+_INDEX = 'i'
+_VALUE = 'v'
+
+# value index for a node in a partly assigned row that doesn't have a value yet
+_UNASSIGNED = -2
+
+# kind by type and field names by dataclass type, filled in as types show up in configs
+# and cleared when they get to _TYPE_CACHE_SIZE, so they don't keep every type alive, e.g. local dataclasses
+_type_kinds = {}
+_field_names = {}
+_TYPE_CACHE_SIZE = 1000
+
+
+def _kind(value_type: type) -> int:
+    kind = _type_kinds.get(value_type)
+    if kind is None:
+        if len(_type_kinds) >= _TYPE_CACHE_SIZE:
+            _type_kinds.clear()
+        if issubclass(value_type, Sweep):
+            kind = _SWEEP
+        elif issubclass(value_type, dict):
+            kind = _DICT
+        elif issubclass(value_type, (list, set, tuple, frozenset)):
+            kind = _SEQUENCE
+        elif is_dataclass(value_type):
+            kind = _DATACLASS
+        else:
+            # numbers, strings, bytes, arrays, enums, classes, ...
+            kind = _LEAF
+        _type_kinds[value_type] = kind
+    return kind
+
+
+def _attribute_items(value: Any) -> List[Tuple[str, Any]]:
+    # attributes of a dataclass instance, skipping dunders
+    # the field names of each dataclass type are kept, so an instance with just its fields, in order,
+    # (nearly all of them) takes its attributes as they are without checking each name
+    names = _field_names.get(type(value))
+    if names is None:
+        if len(_field_names) >= _TYPE_CACHE_SIZE:
+            _field_names.clear()
+        names = tuple(f.name for f in fields(value))
+        _field_names[type(value)] = names
+    attributes = getattr(value, '__dict__', None)
+    if attributes is None:
+        # slots
+        return [(name, getattr(value, name)) for name in names]
+    if tuple(attributes) == names:
+        return list(attributes.items())
+    # attributes added after __init__ or fields it doesn't set
+    return [(name, v) for name, v in attributes.items() if not name.startswith('__')]
+
+
+def _path(link) -> Tuple[Tuple, str]:
+    # path as (attribute_name, key_name, list_index) steps and the object name for the link
+    steps = []
+    while link is not None:
+        link, kind, name, _ = link
+        steps.append((kind, name))
+    steps.reverse()
+
+    path = []
+    object_name = ""
+    for kind, name in steps:
+        if kind == _INDEX:
+            path.append((None, None, name))
+            object_name = f"{object_name}[{name}]"
+        else:
+            path.append((name, None, None) if kind ==
+                        _ATTRIBUTE else (None, name, None))
+            object_name = f"{object_name}.{name}" if len(
+                object_name) else f"{name}"
+    return tuple(path), object_name
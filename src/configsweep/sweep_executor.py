@@ -0,0 +1,196 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Sequence, Tuple
+from configsweep.sweep_scheduler import LocalityScheduler
+
+# each worker (process or thread) rebuilds its own sweeper once
+_worker = threading.local()
+
+
+def _init_worker(configs: List, options: Dict):
+    # import here to avoid a circular import with the sweeper
+    from configsweep.sweeper import Sweeper
+    if options.get("table") is not None:
+        _worker.sweeper = Sweeper.open_table(options["table"])
+    else:
+        _worker.sweeper = Sweeper(configs, **options)
+
+
+def _run_chunk(fn: Callable, indices: Sequence[int]) -> List[Tuple[int, Any]]:
+    sweeper = _worker.sweeper
+    return [(i, fn(sweeper.combination(i))) for i in indices]
+
+
+def _create_executor(executor: str, max_workers: int, configs: List, options: Dict) -> Executor:
+    if executor == "process":
+        return ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(configs, options))
+    return ThreadPoolExecutor(max_workers, initializer=_init_worker, initargs=(configs, options))
+
+
+def map_combinations(configs: List,
+                     options: Dict,
+                     fn: Callable,
+                     indices: Sequence[int],
+                     executor: str = "process",
+                     max_workers: int = None,
+                     ordered: bool = True,
+                     chunksize: int = None,
+                     locality: Sequence[Tuple[Hashable, Hashable]] = None) -> Iterator[Tuple[int, Any]]:
+    """
+    Call fn for each combination index in a pool of workers and yield (index, result)
+
+    configs - the sweep configs with the sweep objects in place
+    options - keyword arguments to create the sweeper in each worker, or the table to open (see Sweeper.compile)
+    locality - optional (group, unit) for each index to keep each worker on the same groups (see LocalityScheduler).
+               Each worker then has its own single worker pool, so chunks go to the worker picked for them.
+               Ordered results wait for the groups before them, up to all of them, so use ordered=False
+
+    Only the chunks of indices are sent to the workers.
+    Each worker creates the sweeper from the configs once and materializes the combinations itself.
+    A limited number of chunks are in flight at a time, so results are streamed back.
+    """
+    max_workers = _check_options(executor, max_workers, chunksize)
+    if chunksize is None:
+        chunksize = _default_chunksize(len(indices), max_workers)
+    if locality is not None:
+        if len(locality) != len(indices):
+            raise ValueError(
+                f"locality must have a key for each index, got {len(locality)} for {len(indices)} indices")
+        return _map_locality(configs, options, fn, indices, locality, executor, max_workers, ordered, chunksize)
+    return _map_chunks(configs, options, fn, [indices], executor, max_workers, ordered, chunksize)
+
+
+def map_batches(configs: List,
+                options: Dict,
+                fn: Callable,
+                batches: Iterable[Sequence[int]],
+                executor: str = "process",
+                max_workers: int = None,
+                ordered: bool = True,
+                chunksize: int = None) -> Iterator[Tuple[int, Any]]:
+    """
+    Same as map_combinations for batches of indices that are worked out as the workers need more,
+    e.g. the combinations in each window of a sweep without a cached result
+
+    batches - each batch is split into chunks, by default a few chunks per worker.
+              An empty batch means there's nothing to run yet, so it waits for a chunk to finish first
+    """
+    max_workers = _check_options(executor, max_workers, chunksize)
+    return _map_chunks(configs, options, fn, batches, executor, max_workers, ordered, chunksize)
+
+
+def _check_options(executor: str, max_workers: int, chunksize: int) -> int:
+    # number of workers to use
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be at least 1, got {max_workers}")
+    if chunksize is not None and chunksize < 1:
+        raise ValueError(f"chunksize must be at least 1, got {chunksize}")
+    if executor not in ("process", "thread"):
+        raise ValueError(
+            f"Unknown executor {executor}.  Use process or thread")
+    return max_workers
+
+
+def _default_chunksize(count: int, max_workers: int) -> int:
+    # a few chunks per worker to balance the load without too much overhead per chunk
+    return max(1, min(256, count // (max_workers * 4)))
+
+
+def _map_chunks(configs: List,
+                options: Dict,
+                fn: Callable,
+                batches: Iterable[Sequence[int]],
+                executor: str,
+                max_workers: int,
+                ordered: bool,
+                chunksize: int) -> Iterator[Tuple[int, Any]]:
+    pool = _create_executor(executor, max_workers, configs, options)
+    max_in_flight = max_workers * 2
+    # submission order is kept for ordered results
+    in_flight = []
+    try:
+        for batch in batches:
+            if not len(batch):
+                if len(in_flight):
+                    yield from _collect(in_flight, ordered)
+                continue
+            size = chunksize or _default_chunksize(len(batch), max_workers)
+            for start in range(0, len(batch), size):
+                in_flight.append(pool.submit(_run_chunk, fn, batch[start:start + size]))
+                if len(in_flight) >= max_in_flight:
+                    yield from _collect(in_flight, ordered)
+        while len(in_flight):
+            yield from _collect(in_flight, ordered)
+    finally:
+        # stopped early or failed, so don't run anything else
+        for future in in_flight:
+            future.cancel()
+        pool.shutdown(wait=True)
+
+
+def _map_locality(configs: List,
+                  options: Dict,
+                  fn: Callable,
+                  indices: Sequence[int],
+                  locality: Sequence[Tuple[Hashable, Hashable]],
+                  executor: str,
+                  max_workers: int,
+                  ordered: bool,
+                  chunksize: int) -> Iterator[Tuple[int, Any]]:
+    scheduler = LocalityScheduler(locality, max_workers)
+    pools = [_create_executor(executor, 1, configs, options) for _ in range(max_workers)]
+    # future -> (worker, chunk of positions)
+    in_flight = {}
+    # results by position waiting for the ones before them, when ordered
+    waiting = {}
+    next_position = 0
+
+    def submit(worker: int):
+        chunk = scheduler.next_chunk(worker, chunksize)
+        if chunk is not None:
+            future = pools[worker].submit(_run_chunk, fn, [indices[p] for p in chunk])
+            in_flight[future] = (worker, chunk)
+
+    try:
+        # two chunks per worker, so it starts the next one as soon as one is done
+        for _ in range(2):
+            for worker in range(max_workers):
+                submit(worker)
+        while len(in_flight):
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                worker, chunk = in_flight.pop(future)
+                results = future.result()
+                submit(worker)
+                if not ordered:
+                    yield from results
+                    continue
+                waiting.update(zip(chunk, results))
+                while next_position in waiting:
+                    yield waiting.pop(next_position)
+                    next_position += 1
+    finally:
+        # stopped early or failed, so don't run anything else
+        for future in in_flight:
+            future.cancel()
+        for pool in pools:
+            pool.shutdown(wait=True)
+
+
+def _collect(in_flight: List, ordered: bool) -> Iterator[Tuple[int, Any]]:
+    # yield the results for at least one chunk and remove it from in flight
+    if ordered:
+        future = in_flight.pop(0)
+        yield from future.result()
+    else:
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            in_flight.remove(future)
+        for future in done:
+            yield from future.result()
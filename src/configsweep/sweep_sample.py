@@ -0,0 +1,104 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import math
+import random
+import warnings
+from bisect import bisect_right
+from typing import List
+
+SAMPLE_METHODS = ("uniform", "sobol", "latin_hypercube")
+
+# rounds of points to replace duplicates before falling back to uniform for the rest
+_MAX_ROUNDS = 10
+
+
+def sample_indices(sweeper, n: int, seed: int, method: str) -> List[int]:
+    """
+    n distinct combination indices from the sweeper in order
+
+    uniform - simple random sample of the indices
+    sobol - scrambled Sobol points (needs scipy)
+    latin_hypercube - Latin hypercube points
+
+    For sobol and latin_hypercube, each point has a coordinate to pick the config and one for each sweep.
+    A point picks the values of the sweeps weighted by the number of combinations under each value (see SweepDag.point_index),
+    so nested sweeps only use their coordinates when they are in the combination.
+    Points landing on the same combination, or on one left out by constraints, are replaced with more points.
+
+    Takes time in proportion to n and the number of sweeps, not the number of combinations
+    """
+    if method not in SAMPLE_METHODS:
+        raise ValueError(
+            f"Unknown sample method {method}.  Use one of {', '.join(SAMPLE_METHODS)}")
+    if n < 0 or n > len(sweeper):
+        raise ValueError(
+            f"n must be from 0 to the number of combinations {len(sweeper)}, got {n}")
+
+    rng = random.Random(seed)
+    if method == "uniform":
+        return sorted(rng.sample(range(len(sweeper)), n))
+    if n == 0:
+        return []
+
+    dimensions = 1 + max(dag.width for dag in sweeper._dags)
+    if method == "sobol":
+        points = _sobol_points(dimensions, seed)
+    else:
+        points = _latin_hypercube_points(dimensions, rng)
+
+    # combinations before constraints up to the end of each config, to pick configs by all their combinations,
+    # since the points on the ones left out are drawn again
+    ends = []
+    for dag in sweeper._dags:
+        ends.append((ends[-1] if len(ends) else 0) + dag.root_node.count)
+    indices = set()
+    for _ in range(_MAX_ROUNDS):
+        if len(indices) == n:
+            break
+        # enough points to make up for the ones left out
+        count = math.ceil((n - len(indices)) * ends[-1] / len(sweeper))
+        for point in points(count):
+            index = _point_index(sweeper, ends, point)
+            if index is not None and len(indices) < n:
+                indices.add(index)
+    # nearly the whole sweep, so points keep landing on the same combinations
+    while len(indices) < n:
+        indices.add(rng.randrange(len(sweeper)))
+    return sorted(indices)
+
+
+def _point_index(sweeper, ends: List[int], point: List[float]) -> int:
+    # the first coordinate picks the config weighted by its number of combinations, None if it's left out
+    position = min(int(point[0] * ends[-1]), ends[-1] - 1)
+    dag_index = bisect_right(ends, position)
+    combo_index = sweeper._dags[dag_index].point_index(point[1:])
+    return None if combo_index is None else sweeper._dags.offset(dag_index) + combo_index
+
+
+def _latin_hypercube_points(dimensions: int, rng: random.Random):
+    def points(count: int) -> List[List[float]]:
+        # one point in each of the count strata of every dimension
+        columns = []
+        for _ in range(dimensions):
+            strata = list(range(count))
+            rng.shuffle(strata)
+            columns.append([(s + rng.random()) / count for s in strata])
+        return [list(point) for point in zip(*columns)]
+    return points
+
+
+def _sobol_points(dimensions: int, seed: int):
+    try:
+        from scipy.stats import qmc
+    except ImportError as e:
+        raise ImportError(
+            "sobol sampling needs scipy, pip install configsweep[sobol]") from e
+    sobol = qmc.Sobol(dimensions, scramble=True, seed=seed)
+
+    def points(count: int) -> List[List[float]]:
+        with warnings.catch_warnings():
+            # balance is best for powers of 2, but any count of points is fine for sampling
+            warnings.simplefilter("ignore", UserWarning)
+            return sobol.random(count).tolist()
+    return points
@@ -0,0 +1,101 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import heapq
+from collections import deque
+from typing import Deque, Hashable, List, Sequence, Tuple
+
+
+class LocalityScheduler:
+    """
+    Hands out chunks of positions to workers so each worker stays on the same priority group,
+    e.g. each worker loads each datasource of Sweep(datasources, priority=1) at most once
+
+    keys - (group, unit) for each position, e.g. the highest priority value and the values of the next sweeps.
+           A unit is a run of positions with the same key, so it's a part of its group
+    workers - number of workers
+
+    Whole groups are assigned to workers up front, the biggest first to the worker with the least work.
+    Each worker goes through its groups in order, a chunk at a time, and a chunk never spans two units.
+    A worker that runs out steals from the worker with the most work left:
+    a whole group it hasn't started if it has one, otherwise the back half of the units left in its group,
+    or the back half of its last unit.  A stolen group is still only loaded by one worker,
+    so only the groups that have to be split to keep every worker busy are loaded more than once
+    """
+
+    def __init__(self, keys: Sequence[Tuple[Hashable, Hashable]], workers: int):
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers}")
+        # units as [start, stop) ranges of positions for each group, groups in the order they show up
+        groups: List[List[range]] = []
+        group_by_key = {}
+        start = 0
+        for position in range(1, len(keys) + 1):
+            if position == len(keys) or keys[position] != keys[start]:
+                group_key = keys[start][0]
+                if group_key not in group_by_key:
+                    group_by_key[group_key] = len(groups)
+                    groups.append([])
+                groups[group_by_key[group_key]].append(range(start, position))
+                start = position
+
+        # biggest groups first to the worker with the least work
+        sizes = [sum(len(unit) for unit in units) for units in groups]
+        assigned: List[List[int]] = [[] for _ in range(workers)]
+        loads = [(0, worker) for worker in range(workers)]
+        for group in sorted(range(len(groups)), key=lambda g: (-sizes[g], g)):
+            load, worker = heapq.heappop(loads)
+            assigned[worker].append(group)
+            heapq.heappush(loads, (load + sizes[group], worker))
+
+        # groups left for each worker in order, each a deque of its units left
+        self._queues: List[Deque[Deque[range]]] = [
+            deque(deque(groups[g]) for g in sorted(worker_groups)) for worker_groups in assigned]
+        self._remaining = [sum(sizes[g] for g in worker_groups) for worker_groups in assigned]
+        self.steals = 0
+
+    def next_chunk(self, worker: int, chunksize: int) -> range:
+        """
+        Positions for the worker to run next, None when there's nothing left anywhere
+        """
+        queue = self._queues[worker]
+        if not len(queue):
+            self._steal(worker)
+            if not len(queue):
+                return None
+        units = queue[0]
+        unit = units.popleft()
+        chunk = unit[:chunksize]
+        if len(unit) > chunksize:
+            units.appendleft(unit[chunksize:])
+        if not len(units):
+            queue.popleft()
+        self._remaining[worker] -= len(chunk)
+        return chunk
+
+    def _steal(self, thief: int):
+        victim = max(range(len(self._queues)), key=lambda w: self._remaining[w])
+        if victim == thief or self._remaining[victim] == 0:
+            return
+        queue = self._queues[victim]
+        if len(queue) > 1:
+            # a group the victim hasn't started
+            stolen = queue.pop()
+        else:
+            units = queue[0]
+            if len(units) > 1:
+                stolen = deque()
+                for _ in range(len(units) // 2):
+                    stolen.appendleft(units.pop())
+            else:
+                unit = units[0]
+                if len(unit) < 2:
+                    return
+                middle = len(unit) // 2
+                units[0] = unit[:middle]
+                stolen = deque([unit[middle:]])
+        count = sum(len(unit) for unit in stolen)
+        self._remaining[victim] -= count
+        self._remaining[thief] += count
+        self._queues[thief].append(stolen)
+        self.steals += 1
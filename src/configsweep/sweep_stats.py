@@ -0,0 +1,118 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import sys
+from dataclasses import is_dataclass
+from enum import Enum
+from typing import Any, Dict
+from configsweep.sweep_dag import _attribute_items
+
+
+class SweepStats:
+    """
+    Counters and per phase timings for a Sweeper, e.g. Sweeper(config, stats=SweepStats())
+    Nothing is measured when a sweeper doesn't have stats
+
+    Phases:
+      copy_templates - defensive copy of the configs when the sweeper is created
+      build - building the SweepDag for a config
+      apply - applying a combination's values to the config
+      copy - copying the config for a combination (deepcopy or shared)
+      describe - building a combination's description
+
+    to_dict() exports everything for a metrics pipeline
+    """
+
+    PHASES = ("copy_templates", "build", "apply", "copy", "describe")
+
+    def __init__(self):
+        self.combinations = 0
+        # estimate of the bytes in the containers and objects copied for the combinations
+        self.bytes_copied = 0
+        self.dags = 0
+        self.nodes = 0
+        self.max_depth = 0
+        self.phases: Dict[str, LatencyHistogram] = {
+            phase: LatencyHistogram() for phase in SweepStats.PHASES}
+
+    def record(self, phase: str, seconds: float):
+        self.phases[phase].record(seconds)
+
+    def record_dag(self, dag):
+        self.dags += 1
+        self.nodes += len(dag.nodes)
+        for node in dag.nodes:
+            depth = 0
+            while node.parent is not None:
+                depth += 1
+                node = node.parent
+            self.max_depth = max(self.max_depth, depth)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"combinations": self.combinations,
+                "bytes_copied": self.bytes_copied,
+                "dags": self.dags,
+                "nodes": self.nodes,
+                "max_depth": self.max_depth,
+                "phases": {phase: histogram.to_dict() for phase, histogram in self.phases.items()}}
+
+
+class LatencyHistogram:
+    """
+    Count, total, min, max and power of 2 microsecond buckets of latencies
+    Bucket b counts latencies up to 2**b microseconds
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets: Dict[int, int] = {}
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+        bucket = max(0, int(seconds * 1e6 + 0.5) - 1).bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"count": self.count,
+                "total_seconds": self.total,
+                "mean_seconds": self.total / self.count if self.count else None,
+                "min_seconds": self.min,
+                "max_seconds": self.max,
+                "buckets_us": {f"<={2 ** b}": self.buckets[b] for b in sorted(self.buckets)}}
+
+
+def deep_sizeof(value: Any) -> int:
+    """
+    Estimate of the bytes deepcopy copies for the value
+    Counts containers and objects, not atomic values like numbers and strings since deepcopy shares them
+    """
+    size = 0
+    seen = set()
+    stack = [value]
+    while len(stack):
+        value = stack.pop()
+        if value is None or isinstance(value, (bool, int, float, complex, str, bytes, Enum, type)) or id(value) in seen:
+            continue
+        seen.add(id(value))
+        size += sys.getsizeof(value)
+        if isinstance(value, dict):
+            stack.extend(value.keys())
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            stack.extend(value)
+        elif hasattr(value, '__dict__'):
+            attributes = vars(value)
+            size += sys.getsizeof(attributes)
+            stack.extend(attributes.values())
+        elif is_dataclass(value):
+            # slotted, the fields are in the object
+            stack.extend(v for _, v in _attribute_items(value))
+    return size
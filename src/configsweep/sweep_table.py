@@ -0,0 +1,94 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import mmap
+import pickle
+import struct
+import sys
+from array import array
+from copy import copy
+
+# file layout:
+#   magic, offset of the metadata
+#   value index matrix for each dag, count rows of width int32 value indices
+#   pickled metadata: version, byte order, matrix offsets and the sweeper with its dags and configs (the value pools)
+_MAGIC = b"CSWPTBL\0"
+_HEADER = struct.Struct("<8sQ")
+_VERSION = 1
+# combinations to write at a time
+_CHUNK = 4096
+
+
+def compile_table(sweeper, path: str):
+    """
+    Write the sweep to a table file that open_table maps into memory
+
+    The value index matrix is written a chunk of combinations at a time, so memory doesn't grow with the sweep.
+    The sweeper is pickled with its dags, so opening the table doesn't build the dags again.
+    The configs must be picklable, including constraint predicates
+    """
+    sweeper._sweep_configs()
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, 0))
+        offsets = []
+        for dag in sweeper._dags:
+            offsets.append(_align(f))
+            for start in range(0, dag.count, _CHUNK):
+                rows = array('i')
+                for combo_index in range(start, min(start + _CHUNK, dag.count)):
+                    rows.extend(dag.row(combo_index))
+                f.write(rows.tobytes())
+
+        # the rows are in the matrix, so leave them out of the pickle
+        table_sweeper = copy(sweeper)
+        table_dags = []
+        for dag in sweeper._dags:
+            table_dag = copy(dag)
+            table_dag.rows = None
+            table_dags.append(table_dag)
+        table_sweeper._dags = sweeper._dags.replace(table_dags)
+        metadata_offset = f.tell()
+        pickle.dump({"version": _VERSION,
+                     "byteorder": sys.byteorder,
+                     "itemsize": array('i').itemsize,
+                     "offsets": offsets,
+                     "sweeper": table_sweeper}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, metadata_offset))
+
+
+def open_table(path: str):
+    """
+    Sweeper for a table file from compile_table
+    The rows of each dag are read straight from the memory mapped matrix, nothing is decoded or copied up front
+    """
+    with open(path, 'rb') as f:
+        table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, metadata_offset = _HEADER.unpack_from(table, 0)
+    if magic != _MAGIC:
+        raise ValueError(f"{path} is not a sweep table")
+    metadata = pickle.loads(table[metadata_offset:])
+    if metadata["version"] != _VERSION:
+        raise ValueError(
+            f"Sweep table {path} has unsupported version {metadata['version']}")
+    if metadata["byteorder"] != sys.byteorder or metadata["itemsize"] != array('i').itemsize:
+        raise ValueError(
+            f"Sweep table {path} was compiled on a machine with a different integer format")
+
+    sweeper = metadata["sweeper"]
+    matrix = memoryview(table)
+    for dag, offset in zip(sweeper._dags, metadata["offsets"]):
+        size = dag.count * dag.width * metadata["itemsize"]
+        dag.rows = matrix[offset:offset + size].cast('i')
+    # workers open the table rather than building the sweeper
+    sweeper._table = table
+    sweeper._options = dict(sweeper._options, table=path)
+    return sweeper
+
+
+def _align(f) -> int:
+    # start each matrix on an 8 byte boundary
+    position = f.tell()
+    padding = -position % 8
+    f.write(b"\0" * padding)
+    return position + padding
@@ -1,10 +1,27 @@
 # SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
 # SPDX-License-Identifier: MIT
 
+import heapq
+import sys
+import time
+from bisect import bisect_left, bisect_right
 from copy import deepcopy
-from configsweep.sweep_dag import SweepDag
+from configsweep.config_builder import compile_builder
+from configsweep.dag_list import DagList
+from configsweep.estimate import SweepEstimate, estimate
+from configsweep.sweep_batch import SweepBatch
 from configsweep.sweep_combination import SweepCombination
-from typing import Any, List, Union
+from configsweep.sweep_executor import map_batches, map_combinations
+from configsweep.export import export_combinations
+from configsweep.sweep_async import aiter_combinations, amap_combinations
+from configsweep.sweep_sample import sample_indices
+from configsweep.checkpoint import SweepCheckpoint
+from configsweep.constraint import Constraint
+from configsweep.fingerprint import CombinationKeys, sweep_fingerprint
+from configsweep.result_store import ResultStore
+from configsweep.sweep_stats import SweepStats, deep_sizeof
+from configsweep.sweep_table import compile_table, open_table
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, List, Sequence, TextIO, Tuple, Union
 
 
 class Sweeper:
@@ -12,11 +29,61 @@ class Sweeper:
     Iterator sweeps over a config with Sweep objects
     Each iteration replaces each sweep object with a combinations of values
     Nested sweep objects are supported
+    Combinations can also be accessed directly by index or slice, e.g. sweeper[10] or sweeper[10:20]
     
     NOTE: a copy of the config is made and copies of the config for each combination are made
+
+    config - a config or a list of configs.  For a list, the sweep for each config (its SweepDag) is built
+             the first time it's needed and released once iteration moves on to the next config,
+             so iterating the first configs or a slice doesn't build the rest.
+             len() and the methods that need every combination (map, export, shard, ...) build them all
+    lazy - decode each combination from its index on demand rather than building all combinations up front.
+           When not lazy, the sweeps for all the configs are built up front too
+    materialize - how the config for each combination is copied
+                  deepcopy - each combination gets a full deep copy of the config
+                  shared - only the containers (dicts, lists, tuples, dataclasses) on the path to a sweep are copied.
+                           All other parts of the config and the sweep values themselves are shared
+                           between combinations, so they must be treated as read-only
+                  compiled - each combination gets a new config built by a function compiled from the config's structure
+                             (see config_builder.compile_builder).  Same config as deepcopy, but faster to build.
+                             Falls back to deepcopy for a config that can't be compiled,
+                             e.g. one with the same object in more than one place
+    stats - optional SweepStats to collect counters and timings for each phase.
+            Only for this sweeper, not the workers in map
+    constraints - optional list of Constraint to leave out combinations, e.g.
+                  Constraint(["strategy.min", "strategy.max"], lambda min, max: min <= max)
+                  Left out combinations are never materialized and aren't in len() or the indices.
+                  For map with the process executor, the predicates must be picklable, i.e. not lambdas.
+                  The paths are checked against all the configs, so the sweeps for all of them are built up front
+    copy_configs - copy the configs to start with, so changes to them after the sweeper is created don't change the sweep.
+                   False skips the copy when the configs aren't changed while the sweeper is used.
+                   The sweep values are then set in the configs themselves while their combinations are materialized.
+                   The sweep objects are put back when iteration moves past each config (or finishes),
+                   after each combination from random access (sweeper[i], shard, sample, resume) and after export.
+                   Stopping an iteration part way leaves the last combination's values in the config
     """
 
-    def __init__(self, config: Union[Any, List]):
+    MATERIALIZE_MODES = ("deepcopy", "shared", "compiled")
+    SCHEDULES = ("chunks", "locality")
+    # number of results to get from a ResultStore at a time
+    _CACHE_BATCH = 500
+
+    def __init__(self,
+                 config: Union[Any, List],
+                 lazy: bool = True,
+                 materialize: str = "deepcopy",
+                 stats: SweepStats = None,
+                 constraints: List[Constraint] = None,
+                 copy_configs: bool = True):
+        if materialize not in Sweeper.MATERIALIZE_MODES:
+            raise ValueError(
+                f"Unknown materialize mode {materialize}.  Use one of {', '.join(Sweeper.MATERIALIZE_MODES)}")
+        self._materialize_mode = materialize
+        # options to create the same sweeper again, e.g. in a worker process
+        self._options = {"lazy": lazy, "materialize": materialize,
+                         "constraints": list(constraints or [])}
+        self._stats = stats
+
         if config is None:
             config_list = []
         else:
@@ -24,27 +91,535 @@ class Sweeper:
 
         # create a copy of the config to hack up and sweep through the Sweep class value list combos
         # if no copy is made:
-        #   Config is shared for all combos and put back in place after all sweeps
-        #   This means each sweepcombination.config is lost on the next iteration
+        #   The sweep values are set in the caller's config and put back in place after its combos
         #   Exiting the sweeper before completion all combinations will leave config in a bad state
-        # So we won't expose this option for now
-        self._copy = True
+        # Workers in map always copy, since the thread executor shares the configs
+        self._copy = copy_configs
+        if stats is not None:
+            start = time.perf_counter()
         self._config_templates = [
             deepcopy(s) for s in config_list] if self._copy else config_list
-        self._dags = [SweepDag(s) for s in self._config_templates]
-        self._len = 0
-        for d in self._dags:
-            self._len += len(d.root_node.combos)
+        if stats is not None:
+            stats.record("copy_templates", time.perf_counter() - start)
+        self._dags = DagList(self._config_templates, lazy, self._options["constraints"], stats)
+        if not lazy or self._options["constraints"]:
+            self._dags.total()
+        elif len(self._dags):
+            # the first one is needed to start, and errors in a single config show up here
+            self._dags[0]
+        for constraint in self._options["constraints"]:
+            for path in constraint.paths:
+                if not any(node.object_name == path for dag in self._dags for node in dag.nodes):
+                    raise ValueError(
+                        f"Constraint path {path} is not a Sweep in the config")
+        # estimate of bytes deep copied for each config, when there are stats
+        self._template_sizes = [None] * len(self._dags)
+        # keys for the combinations of each dag, created when needed
+        self._combination_keys: List[CombinationKeys] = [None] * len(self._dags)
+        # memory map for a sweeper opened from a sweep table
+        self._table = None
+        # compiled builder for each dag, compiled when needed, False if it can't be compiled
+        self._builders = [None] * len(self._dags)
+        # dag index, combo index and row of the last combination built
+        self._last_built = None
         self._current_dag = None
 
+    def __getstate__(self):
+        # the sweep definition without the iteration state and anything by id
+        self._sweep_configs()
+        state = dict(self.__dict__)
+        state["_stats"] = None
+        state["_combination_keys"] = [None] * len(self._dags)
+        state["_table"] = None
+        state["_builders"] = [None] * len(self._dags)
+        state["_last_built"] = None
+        state["_current_dag"] = None
+        return state
+
+    def compile(self, path: str):
+        """
+        Compile the sweep into a table file, so other processes can open it with Sweeper.open_table
+        without building the sweep again, e.g. many workers on the same machine
+
+        The file has the matrix of value indices for all the combinations
+        and the pickled sweeper with the configs and their sweep values.
+        The configs must be picklable, including any constraint predicates
+        """
+        compile_table(self, path)
+
+    @staticmethod
+    def open_table(path: str) -> "Sweeper":
+        """
+        Open a sweep table from compile
+        The matrix of value indices is memory mapped and each combination row is read from it when needed,
+        so processes opening the same table share it through the page cache.
+        map() workers open the table too
+        """
+        return open_table(path)
+
+    @staticmethod
+    def estimate(config: Union[Any, List], memory_budget: int = None) -> SweepEstimate:
+        """
+        Number of combinations, values per sweep, bytes per config and rough copy time for a config,
+        without creating a sweeper or building any combinations (see estimate.estimate)
+
+        memory_budget - optional bytes available, warns when not lazy or keeping all the configs would take more
+        """
+        return estimate(config, memory_budget)
+
     def __len__(self) -> int:
-        return self._len
+        return self._dags.total()
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[SweepCombination, List[SweepCombination]]:
+        if isinstance(index, slice):
+            start, stop, step = index.start or 0, index.stop, index.step or 1
+            if start >= 0 and stop is not None and stop >= 0 and step > 0:
+                # only the configs up to stop are needed
+                return [self.combination(i) for i in range(start, self._dags.limit(stop), step)]
+            return [self.combination(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return self.combination(index)
+
+    def combination(self, index: int) -> SweepCombination:
+        """
+        Get the combination for the index directly without iterating through the earlier combinations
+        Same combination as iterating to the index
+        Without copy_configs, the caller's config is put back the way it was after the combination is made
+        """
+        dag_index, combo_index = self._locate(index)
+        combo = self._materialize(dag_index, combo_index, index)
+        if not self._copy:
+            self._dags[dag_index].apply_sweep_to_config()
+        return combo
+
+    def _locate(self, index: int) -> Tuple[int, int]:
+        # dag index and combo index within the dag for the global combination index
+        return self._dags.locate(index)
+
+    def shard(self, shard_id: int, num_shards: int, strategy: str = "contiguous") -> Iterator[SweepCombination]:
+        """
+        Iterate only the combinations for one shard of the sweep
+        Each combination keeps its global index
+
+        Every shard id from 0 to num_shards - 1 gets a deterministic, non-overlapping part of the sweep
+        Strategies:
+          contiguous - one contiguous range of combinations per shard
+          strided - every num_shards combination starting at shard_id
+          priority-aware - whole ranges that share the value of the highest priority sweep stay on one shard,
+                           e.g. a datasource is loaded once per shard.  The biggest ranges go first,
+                           each to the shard with the fewest combinations so far, so shards are as even as the
+                           ranges allow.  Shards can be empty when there are fewer groups than shards
+        """
+        return self._iter_ranges(self._shard_ranges(shard_id, num_shards, strategy))
+
+    def _iter_ranges(self, ranges: List[range]) -> Iterator[SweepCombination]:
+        for indices in ranges:
+            for i in indices:
+                yield self.combination(i)
+
+    def _shard_ranges(self, shard_id: int, num_shards: int, strategy: str) -> List[range]:
+        if num_shards < 1:
+            raise ValueError(f"num_shards must be at least 1, got {num_shards}")
+        if shard_id < 0 or shard_id >= num_shards:
+            raise ValueError(
+                f"shard_id must be from 0 to {num_shards - 1}, got {shard_id}")
+
+        total = len(self)
+        if strategy == "contiguous":
+            return [range(total * shard_id // num_shards, total * (shard_id + 1) // num_shards)]
+        elif strategy == "strided":
+            return [range(shard_id, total, num_shards)]
+        elif strategy == "priority-aware":
+            # whole groups, biggest first to the shard with the fewest combinations (same as LocalityScheduler)
+            # ties go to the earlier group and the lower shard id, so every shard works out the same assignment
+            groups = []
+            for dag_index, dag in enumerate(self._dags):
+                offset = self._dags.offset(dag_index)
+                groups.extend(range(offset + start, offset + stop) for start, stop in dag.priority_groups())
+            ranges = []
+            loads = [(0, shard) for shard in range(num_shards)]
+            for group in sorted(groups, key=lambda r: (-len(r), r.start)):
+                load, shard = heapq.heappop(loads)
+                if shard == shard_id:
+                    ranges.append(group)
+                heapq.heappush(loads, (load + len(group), shard))
+            return sorted(ranges, key=lambda r: r.start)
+        else:
+            raise ValueError(
+                f"Unknown shard strategy {strategy}.  Use contiguous, strided or priority-aware")
+
+    def sample(self, n: int, seed: int = None, method: str = "uniform") -> List[SweepCombination]:
+        """
+        n distinct combinations drawn without going through the sweep, in index order
+        Each combination keeps its global index
+
+        seed - seed for the same sample every time
+        method - uniform - simple random sample of the combinations
+                 sobol - scrambled Sobol points for better coverage of the sweep values (needs scipy)
+                 latin_hypercube - Latin hypercube points, every value of each sweep shows up evenly
+        Nested sweeps are only picked along with the value they are under.
+        Takes time in proportion to n, so a sample from a sweep of 10^12 combinations is fine
+        """
+        return [self.combination(i) for i in sample_indices(self, n, seed, method)]
+
+    def export(self,
+               file: Union[str, TextIO],
+               format: str = "jsonl",
+               include_config: bool = False,
+               start: int = 0,
+               stop: int = None,
+               shard: Tuple[int, int] = None,
+               strategy: str = "contiguous",
+               buffer_size: int = 1000) -> int:
+        """
+        Write the combinations to a jsonl or csv file (path or open text file), e.g. for an external scheduler
+        Returns the number of combinations written
+
+        format - jsonl - a json object per line with the index, assignments and values by sweep object name
+                 csv - a row per combination with the index and a column per sweep object name
+        include_config - also write the config for each combination with classifiedjson
+        start, stop - only the combinations in this range of indices
+        shard - only the combinations for (shard_id, num_shards) with the strategy (see shard)
+        buffer_size - number of combinations written at a time
+
+        Streams through the combinations without copying configs, so memory doesn't depend on the size of the sweep
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        if shard is not None:
+            ranges = self._shard_ranges(shard[0], shard[1], strategy)
+        else:
+            ranges = [range(len(self))]
+        # only the part of each range from start to stop
+        ranges = [r[bisect_left(r, start):bisect_left(r, stop)] for r in ranges]
+        return export_combinations(self, file, format, ranges, include_config, buffer_size)
+
+    def iter_batches(self, batch_size: int = 1024, start: int = 0, stop: int = None) -> Iterator[SweepBatch]:
+        """
+        Iterate the combinations in batches of columns of value indices, one column per sweep (see SweepBatch)
+        For vectorized evaluators that don't need a config per combination.
+        Nothing is applied or copied, the columns are worked out from the counts in the dag
+
+        batch_size - most combinations in a batch.  Batches are shorter at the end of each config
+        start, stop - only the combinations in this range of indices
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+        stop = len(self) if stop is None else min(stop, len(self))
+        return self._iter_batches(batch_size, max(start, 0), stop)
+
+    def _iter_batches(self, batch_size: int, start: int, stop: int) -> Iterator[SweepBatch]:
+        index = start
+        while index < stop:
+            dag_index, combo_index = self._locate(index)
+            dag = self._dags[dag_index]
+            size = min(batch_size, stop - index, dag.count - combo_index)
+            yield SweepBatch(index, size, dag.nodes, dag.columns(combo_index, combo_index + size))
+            index += size
+
+    def map(self,
+            fn: Callable[[SweepCombination], Any],
+            executor: str = "process",
+            max_workers: int = None,
+            ordered: bool = None,
+            chunksize: int = None,
+            cache: ResultStore = None,
+            indices: Sequence[int] = None,
+            schedule: str = "chunks",
+            locality_levels: int = 2) -> Iterator[Tuple[int, Any]]:
+        """
+        Call fn with each combination in a pool of workers and yield (combination index, result)
+
+        executor - process or thread.  For process, fn and the config must be picklable
+        max_workers - number of workers, defaults to the number of cpus
+        ordered - yield results in the order of the indices, otherwise as soon as they are done.
+                  Defaults to ordered, except for the locality schedule
+        chunksize - number of combinations sent to a worker at a time, defaults to a few chunks per worker
+        cache - optional ResultStore.  Combinations with a result in the store for their config (see combination_key)
+                aren't run again, and new results are put in the store.
+                The keys are worked out and checked a window at a time as the results are needed,
+                except for the locality schedule, which needs to know what to run up front
+        indices - only the combinations with these indices, defaults to all of them
+        schedule - chunks - chunks of combinations go to whichever worker is free
+                   locality - whole groups of combinations with the same value of the highest priority sweep
+                              go to one worker (see priority-aware shards), e.g. with Sweep(datasources, priority=1)
+                              each worker loads a datasource once.  A worker that runs out of work steals a group
+                              another worker hasn't started, or else part of its group, so all workers stay busy.
+                              Workers go through their groups at the same time, so ordered results have to wait for
+                              the groups before them, which can hold up to all the results in memory.
+                              Not ordered by default
+        locality_levels - for locality, the sweeps (in priority order) whose values stay together when part
+                          of a group is stolen, e.g. 2 only splits a group between values of the next sweep
+
+        Only combination indices are sent to the workers.
+        Each worker creates the sweeper once and materializes its combinations itself.
+        """
+        if schedule not in Sweeper.SCHEDULES:
+            raise ValueError(
+                f"Unknown schedule {schedule}.  Use one of {', '.join(Sweeper.SCHEDULES)}")
+        if locality_levels < 1:
+            raise ValueError(f"locality_levels must be at least 1, got {locality_levels}")
+        if ordered is None:
+            ordered = schedule != "locality"
+        if indices is None:
+            indices = range(len(self))
+        else:
+            for i in indices:
+                self._locate(i)
+        configs = self._sweep_configs()
+        if self._table is not None:
+            # workers open the table, the configs aren't needed
+            configs = None
+        if cache is None:
+            return map_combinations(configs, self._options, fn, indices, executor, max_workers, ordered, chunksize,
+                                    self._locality_keys(indices, locality_levels) if schedule == "locality" else None)
+
+        if schedule == "locality":
+            # the scheduler needs all the indices to run up front
+            keys = [self.combination_key(i) for i in indices]
+            cached = cache.contains_many(keys)
+            missing = [i for i, key in zip(indices, keys) if key not in cached]
+            windows = _CacheWindows(self, cache, indices, keys, cached)
+            results = map_combinations(configs, self._options, fn, missing, executor, max_workers, ordered, chunksize,
+                                       self._locality_keys(missing, locality_levels))
+        else:
+            # keys are worked out a window at a time, as the results are needed
+            windows = _CacheWindows(self, cache, indices)
+            results = map_batches(configs, self._options, fn, windows.misses(), executor, max_workers, ordered,
+                                  chunksize)
+        return self._map_cached(cache, windows, results, ordered)
+
+    def _locality_keys(self, indices: Sequence[int], levels: int) -> List[Tuple]:
+        # (priority group, group for the levels) of each index, see LocalityScheduler
+        starts = {}
+        keys = []
+        for index in indices:
+            dag_index, combo_index = self._locate(index)
+            if dag_index not in starts:
+                dag = self._dags[dag_index]
+                starts[dag_index] = ([start for start, _ in dag.priority_groups()],
+                                     [start for start, _ in dag.priority_groups(levels)])
+            groups, units = starts[dag_index]
+            keys.append(((dag_index, bisect_right(groups, combo_index)),
+                         (dag_index, bisect_right(units, combo_index))))
+        return keys
+
+    def _map_cached(self, cache: ResultStore, windows: "_CacheWindows", results: Iterator, ordered: bool):
+        try:
+            # unordered, results out so far and how many the windows so far have to run
+            run = 0
+            expected = 0
+            for w in range(windows.count):
+                window, keys, cached = windows.window(w)
+                found = cache.get_many([key for key in keys if key in cached])
+                if ordered:
+                    # results come back in order, so fill in the cached ones between them
+                    for index, key in zip(window, keys):
+                        if key in cached:
+                            yield index, found[key]
+                        else:
+                            index, result = next(results)
+                            cache.put(windows.key(index), result)
+                            yield index, result
+                else:
+                    # the cached ones, then as many results as the window has to run, whichever window they're from
+                    for index, key in zip(window, keys):
+                        if key in cached:
+                            yield index, found[key]
+                    expected += sum(1 for key in keys if key not in cached)
+                    while run < expected:
+                        index, result = next(results)
+                        run += 1
+                        cache.put(windows.key(index), result)
+                        yield index, result
+                windows.done(w)
+        finally:
+            results.close()
+            cache.flush()
+
+    def combination_key(self, index: int) -> str:
+        """
+        Stable key for the config of the combination without materializing it, e.g. to cache results
+        Same for the same config in any sweep, so it doesn't change when values are added to a sweep
+        """
+        dag_index, combo_index = self._locate(index)
+        dag = self._dags[dag_index]
+        if dag._applied_row is not None:
+            # keys are found with the sweep objects in place
+            dag.apply_sweep_to_config()
+        if self._combination_keys[dag_index] is None:
+            self._combination_keys[dag_index] = CombinationKeys(dag)
+        return self._combination_keys[dag_index].key(dag.row(combo_index))
+
+    def amap(self,
+             coro_fn: Callable[[SweepCombination], Awaitable],
+             concurrency: int = 10,
+             ordered: bool = False) -> AsyncIterator[Tuple[int, Any]]:
+        """
+        Await coro_fn with each combination, at most concurrency at a time, and yield (combination index, result)
+        For I/O bound work in asyncio, e.g.
+
+        async for index, result in sweeper.amap(evaluate, concurrency=8):
+
+        ordered - yield results in combination order, otherwise as soon as they are done
+        If a call fails, the outstanding calls are cancelled and the error is raised
+        """
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+        return amap_combinations(self, coro_fn, range(len(self)), concurrency, ordered)
+
+    def __aiter__(self) -> AsyncIterator[SweepCombination]:
+        return aiter_combinations(self, range(len(self)))
+
+    def fingerprint(self) -> str:
+        """
+        Fingerprint of the sweep definition, stable across runs
+        Changes if a sweep is added, removed, moved, re-prioritized or its values change,
+        if any other value in the configs changes or if a constraint changes
+        """
+        self._sweep_configs()
+        return sweep_fingerprint(self._dags)
+
+    def resume(self, checkpoint_path: str, save_every: int = 100, save_seconds: float = 30.0) -> Iterator[SweepCombination]:
+        """
+        Iterate the combinations not completed in the checkpoint file, saving progress along the way
+        Starts from the beginning if the file doesn't exist yet
+
+        A combination is in flight once it's yielded and completed when the next one is asked for,
+        so a combination that was being processed when the sweep died runs again on resume.
+        Completed combinations are skipped without materializing them.
+
+        checkpoint_path - local json file for the progress
+        save_every - save after this many changes
+        save_seconds - save after this many seconds since the last save
+        Raises ValueError if the checkpoint is for a different sweep definition
+        """
+        checkpoint = SweepCheckpoint.load(checkpoint_path, self.fingerprint(),
+                                          save_every=save_every, save_seconds=save_seconds)
+        return self._resume(checkpoint)
+
+    def _resume(self, checkpoint: SweepCheckpoint) -> Iterator[SweepCombination]:
+        try:
+            index = checkpoint.next_incomplete(0)
+            while index < len(self):
+                checkpoint.start(index)
+                yield self.combination(index)
+                checkpoint.complete(index)
+                index = checkpoint.next_incomplete(index + 1)
+        finally:
+            checkpoint.save()
+
+    def _sweep_configs(self) -> List:
+        """
+        The configs with the sweep objects back in place, i.e. the sweep definition
+        """
+        # the configs of dags that aren't built have them in place already
+        for dag in self._dags.built():
+            dag.apply_sweep_to_config()
+        return self._config_templates
+
+    def _materialize(self, dag_index: int, combo_index: int, index: int) -> SweepCombination:
+        if self._stats is not None:
+            return self._materialize_with_stats(dag_index, combo_index, index)
+
+        dag = self._dags[dag_index]
+        if self._materialize_mode == "compiled":
+            builder = self._builder(dag_index)
+            if builder:
+                row, previous_row = self._built_rows(dag_index, combo_index)
+                return SweepCombination(None, builder(row), index, dag, row, previous_row)
+
+        # apply the combo to substitute values in the config
+        # only the values that changed since the last combo applied are set
+        row, previous_row = dag.apply_combo(combo_index)
+
+        # return a copy of the config with all sweep values replaced
+        # the description of the sweep combination used is built when needed
+        if self._materialize_mode == "shared":
+            config = dag.copy_config()
+        else:
+            config = deepcopy(self._config_templates[dag_index])
+
+        return SweepCombination(None, config, index, dag, row, previous_row)
+
+    def _materialize_with_stats(self, dag_index: int, combo_index: int, index: int) -> SweepCombination:
+        # same as _materialize, but measure each phase
+        stats = self._stats
+        dag = self._dags[dag_index]
+        if self._materialize_mode == "compiled":
+            builder = self._builder(dag_index)
+            if builder:
+                start = time.perf_counter()
+                row, previous_row = self._built_rows(dag_index, combo_index)
+                build_start = time.perf_counter()
+                stats.record("apply", build_start - start)
+                config = builder(row)
+                stats.record("copy", time.perf_counter() - build_start)
+                if self._template_sizes[dag_index] is None:
+                    self._template_sizes[dag_index] = deep_sizeof(config)
+                stats.bytes_copied += self._template_sizes[dag_index]
+                stats.combinations += 1
+                return SweepCombination(None, config, index, dag, row, previous_row)
+
+        start = time.perf_counter()
+        row, previous_row = dag.apply_combo(combo_index)
+        copy_start = time.perf_counter()
+        stats.record("apply", copy_start - start)
+
+        if self._materialize_mode == "shared":
+            memo = {}
+            config = dag.copy_config(memo)
+            stats.record("copy", time.perf_counter() - copy_start)
+            stats.bytes_copied += sum(sys.getsizeof(c) + (sys.getsizeof(vars(c)) if hasattr(c, '__dict__') else 0)
+                                      for c in memo.values())
+        else:
+            config = deepcopy(self._config_templates[dag_index])
+            stats.record("copy", time.perf_counter() - copy_start)
+            if self._template_sizes[dag_index] is None:
+                self._template_sizes[dag_index] = deep_sizeof(config)
+            stats.bytes_copied += self._template_sizes[dag_index]
+
+        stats.combinations += 1
+        return SweepCombination(None, config, index, dag, row, previous_row)
+
+    def _release_dag(self, dag_index: int):
+        # along with everything for the dag, built again if needed
+        self._dags.release(dag_index)
+        self._builders[dag_index] = None
+        self._combination_keys[dag_index] = None
+        if self._last_built is not None and self._last_built[0] == dag_index:
+            self._last_built = None
+
+    def _builder(self, dag_index: int):
+        builder = self._builders[dag_index]
+        if builder is None:
+            dag = self._dags[dag_index]
+            if dag._applied_row is not None:
+                # compiled with the sweep objects in place
+                dag.apply_sweep_to_config()
+            try:
+                builder = compile_builder(dag)
+            except ValueError:
+                builder = False
+            self._builders[dag_index] = builder
+        return builder
+
+    def _built_rows(self, dag_index: int, combo_index: int) -> Tuple:
+        # the row for the combo and the row before it, without applying anything
+        last = self._last_built
+        if last is not None and last[0] == dag_index and last[1] == combo_index - 1:
+            previous_row = last[2]
+        else:
+            previous_row = self._dags[dag_index].row(combo_index - 1) if combo_index > 0 else None
+        row = self._dags[dag_index].row(combo_index)
+        self._last_built = (dag_index, combo_index, row)
+        return row, previous_row
 
     def __iter__(self):
         self._pos = 0
         self._dag_index = 0
         self._combo_index = 0
-        if self._len:
+        if len(self._dags):
             self._current_dag = self._dags[self._dag_index]
         else:
             self._current_dag = None
@@ -56,35 +631,102 @@ class Sweeper:
             raise StopIteration
 
         # see if we are done with combos for the current dag
-        if self._combo_index == len(self._current_dag.root_node.combos):
-            if not self._copy:
-                # set config back the way it was to start with the sweep objects in place
-                # only needed if not copying
-                self._current_dag.apply_sweep_to_config()
-            # on to the next config/dag if available
-            self._dag_index += 1
-            self._combo_index = 0  # reset pos to iterate through next dag
-            if self._dag_index == len(self._dags):
+        # (constraints can leave a dag without any combos)
+        while self._combo_index == self._current_dag.count:
+            if self._dag_index + 1 == len(self._dags):
+                if not self._copy:
+                    # set config back the way it was to start with the sweep objects in place
+                    # only needed if not copying
+                    self._current_dag.apply_sweep_to_config()
                 self._current_dag = None  # fin
                 raise StopIteration
-            else:
-                self._current_dag = self._dags[self._dag_index]
-
-        # apply the combo to substitute values in the config
-        # get a description of the substitutions made
-        description_list = self._current_dag.apply_combo_to_config(
-            self._combo_index)
-
-        # return a copy of the config with all sweep values replaced
-        # also include description of the sweep combination used
-        if self._copy:
-            config = deepcopy(self._config_templates[self._dag_index])
-        else:
-            config = self._config_templates[self._dag_index]
+            # done with this config, release its dag (and put its sweep objects back) and on to the next config/dag
+            self._release_dag(self._dag_index)
+            self._dag_index += 1
+            self._combo_index = 0  # reset pos to iterate through next dag
+            self._current_dag = self._dags[self._dag_index]
 
-        combo = SweepCombination(
-            "\n".join(description_list), config, self._pos)
+        combo = self._materialize(
+            self._dag_index, self._combo_index, self._pos)
         # prep for next combo
         self._combo_index += 1
         self._pos += 1
         return combo
+
+
+class _CacheWindows:
+    """
+    The indices for map with a cache a window at a time, with the combination key of each one and the keys in the cache
+    The combinations to run in each window go to the workers at most _LOOKAHEAD windows ahead of the results,
+    so the keys are only worked out as they're needed
+
+    keys, cached - optional keys for all the indices and the ones in the cache, worked out up front
+    """
+
+    _LOOKAHEAD = 2
+
+    def __init__(self, sweeper: Sweeper, cache: ResultStore, indices: Sequence[int],
+                 keys: List[str] = None, cached: set = None):
+        self._sweeper = sweeper
+        self._cache = cache
+        self._indices = indices
+        self._keys = keys
+        self._cached = cached
+        self._size = Sweeper._CACHE_BATCH
+        self.count = (len(indices) + self._size - 1) // self._size
+        # window -> (indices, keys, cached keys) until both the results and the workers are past it
+        self._windows = {}
+        # windows done by the results and given to the workers
+        self._done = 0
+        self._given = 0
+        # key of each index given to the workers, until its result is put in the cache
+        self._key_by_index = {}
+        if keys is not None:
+            self._key_by_index = {i: key for i, key in zip(indices, keys) if key not in cached}
+            self._given = self.count
+
+    def window(self, w: int) -> Tuple[Sequence[int], List[str], set]:
+        if w not in self._windows:
+            start = w * self._size
+            indices = self._indices[start:start + self._size]
+            if self._keys is None:
+                keys = [self._sweeper.combination_key(i) for i in indices]
+                cached = self._cache.contains_many(keys)
+            else:
+                keys = self._keys[start:start + self._size]
+                cached = self._cached
+            self._windows[w] = (indices, keys, cached)
+        return self._windows[w]
+
+    def done(self, w: int):
+        """
+        All the results for the window are out
+        """
+        self._done = w + 1
+        if self._given > w:
+            del self._windows[w]
+
+    def key(self, index: int) -> str:
+        """
+        Key for a combination that was run
+        """
+        key = self._key_by_index.pop(index, None)
+        # an index in indices more than once was only kept once
+        return self._sweeper.combination_key(index) if key is None else key
+
+    def misses(self) -> Iterator[List[int]]:
+        """
+        Batches of the indices without a result in the cache, one per window, for map_batches
+        """
+        for w in range(self.count):
+            while w - self._done >= _CacheWindows._LOOKAHEAD:
+                # far enough ahead, wait for results
+                yield []
+            indices, keys, cached = self.window(w)
+            batch = [index for index, key in zip(indices, keys) if key not in cached]
+            self._key_by_index.update((index, key) for index, key in zip(indices, keys) if key not in cached)
+            self._given = w + 1
+            if self._done > w:
+                del self._windows[w]
+            if len(batch):
+                yield batch
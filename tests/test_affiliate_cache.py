@@ -0,0 +1,84 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import pytest
+from dataclasses import dataclass
+from configsweep import AffiliateCache, Sweep, Sweeper
+
+created = []
+
+
+@dataclass
+class DataConfig:
+    name: str = ""
+    rows: int = 10
+
+    def create_affiliate(self):
+        created.append((self.name, self.rows))
+        return DataLoader(self)
+
+
+class DataLoader:
+    def __init__(self, config: DataConfig):
+        self.config = config
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_priority_group():
+    created.clear()
+    config = {"x": Sweep([1, 2, 3]),
+              "data": Sweep([DataConfig("en"), DataConfig("es")], priority=1)}
+    sweeper = Sweeper(config)
+    evicted = []
+    cache = AffiliateCache(sweeper, on_evict=lambda a: evicted.append(a.config.name))
+    for combo in sweeper:
+        loader = cache.affiliate(combo, "data")
+        assert loader.config == combo.config["data"]
+        # only the current datasource is kept
+        assert len(cache) == 1
+    # each datasource is created once and evicted after its last combination
+    assert created == [("en", 10), ("es", 10)]
+    assert evicted == ["en"]
+    assert cache.hits == 4
+    assert cache.misses == 2
+    cache.clear()
+    assert evicted == ["en", "es"]
+    assert len(cache) == 0
+
+
+def test_nested_low_priority():
+    created.clear()
+    config = {"data": Sweep([DataConfig("en", rows=Sweep([10, 20])), DataConfig("es")]),
+              "x": Sweep([1, 2, 3], priority=1)}
+    sweeper = Sweeper(config)
+    cache = AffiliateCache(sweeper)
+    for combo in sweeper:
+        loader = cache.affiliate(combo, "data")
+        assert loader.config == combo.config["data"]
+    # the data sweep changes every combination, but each value is only created once
+    # and kept until its last combination in the last x value
+    assert created == [("en", 10), ("en", 20), ("es", 10)]
+    assert len(cache) == 1
+    assert cache.misses == 3
+
+    with pytest.raises(KeyError) as e_info:
+        cache.affiliate(sweeper[0], "data.name")
+
+
+def test_dag_built_again():
+    created.clear()
+    config = {"x": Sweep([1, 2, 3]),
+              "data": Sweep([DataConfig("en"), DataConfig("es")], priority=1)}
+    sweeper = Sweeper([config, {"y": Sweep([1, 2])}])
+    cache = AffiliateCache(sweeper)
+    cache.affiliate(sweeper[0], "data")
+    # iterating releases the first config's dag, so it's built again for the next combination
+    for combo in sweeper:
+        pass
+    loader = cache.affiliate(sweeper[1], "data")
+    assert loader.config == DataConfig("en")
+    assert created == [("en", 10)]
+    assert cache.hits == 1
@@ -0,0 +1,118 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import json
+import pytest
+from dataclasses import dataclass
+from configsweep import Constraint, Sweep, Sweeper, SweepCheckpoint
+
+
+def make_config(values=[1, 2, 3, 4, 5]):
+    return {"x": Sweep(values), "y": {"name": Sweep(["a", "b"]), "max": 100}}
+
+
+def test_resume(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    sweeper = Sweeper(make_config())
+    seen = []
+    for combo in sweeper.resume(path):
+        if combo.index == 4:
+            # dies while processing 4
+            break
+        seen.append(combo.index)
+    assert seen == [0, 1, 2, 3]
+    with open(path, 'r') as f:
+        data = json.load(f)
+    assert data["completed"] == [[0, 4]]
+    assert data["in_flight"] == [4]
+
+    # resume with a new sweeper for the same definition
+    sweeper = Sweeper(make_config())
+    combos = list(sweeper.resume(path))
+    assert [c.index for c in combos] == list(range(4, 10))
+    assert [c.config for c in combos] == [sweeper[i].config for i in range(4, 10)]
+
+    # nothing left
+    assert list(Sweeper(make_config()).resume(path)) == []
+
+
+def test_resume_changed(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    for combo in Sweeper(make_config()).resume(path):
+        break
+    with pytest.raises(ValueError) as e_info:
+        Sweeper(make_config([1, 2, 3, 4, 6])).resume(path)
+    with pytest.raises(ValueError) as e_info:
+        Sweeper({"x": Sweep([1, 2, 3, 4, 5], priority=1), "y": {"name": Sweep(["a", "b"]), "max": 100}}).resume(path)
+    # a value that isn't swept
+    with pytest.raises(ValueError) as e_info:
+        Sweeper({"x": Sweep([1, 2, 3, 4, 5]), "y": {"name": Sweep(["a", "b"]), "max": 200}}).resume(path)
+    # unchanged still resumes
+    assert len(list(Sweeper(make_config()).resume(path))) == 10
+
+
+def test_fingerprint_config():
+    config = {"model": "resnet", "x": Sweep([1, 2, 3])}
+    sweeper = Sweeper(config)
+    assert Sweeper({"model": "vit", "x": Sweep([1, 2, 3])}).fingerprint() != sweeper.fingerprint()
+    assert Sweeper({"model": "resnet", "x": Sweep([1, 2, 3])}).fingerprint() == sweeper.fingerprint()
+    # constraints that leave out the same number of combinations
+    assert Sweeper(config, constraints=[Constraint(["x"], lambda x: x > 1)]).fingerprint() != \
+        Sweeper(config, constraints=[Constraint(["x"], lambda x: x < 3)]).fingerprint()
+    # same function with a different value from where it was made
+    assert Sweeper(config, constraints=[Constraint(["x"], not_equal(1))]).fingerprint() != \
+        Sweeper(config, constraints=[Constraint(["x"], not_equal(2))]).fingerprint()
+
+
+def not_equal(value):
+    return lambda x: x != value
+
+
+def test_completed_ranges(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = SweepCheckpoint(path, "abc", save_every=1000)
+    for i in [5, 0, 2, 1, 6, 9, 4]:
+        checkpoint.start(i)
+        checkpoint.complete(i)
+    assert checkpoint.completed_count == 7
+    assert checkpoint.next_incomplete(0) == 3
+    assert checkpoint.next_incomplete(3) == 3
+    assert checkpoint.next_incomplete(4) == 7
+    assert checkpoint.next_incomplete(9) == 10
+    checkpoint.start(3)
+    checkpoint.save()
+
+    checkpoint = SweepCheckpoint.load(path, "abc")
+    assert checkpoint._starts == [0, 4, 9]
+    assert checkpoint._stops == [3, 7, 10]
+    assert checkpoint.in_flight == {3}
+    assert not checkpoint.is_completed(3)
+    assert checkpoint.is_completed(5)
+
+
+def relu(x):
+    return max(x, 0)
+
+
+def tanh(x):
+    return x
+
+
+@dataclass
+class Slotted:
+    __slots__ = ("rate",)
+    rate: float
+
+
+def test_fingerprint_named_values():
+    sweeper = Sweeper({"act": Sweep([relu, tanh]), "model": Sweep([dict, list])})
+    # functions and classes are part of the definition by name
+    assert Sweeper({"act": Sweep([tanh, relu]), "model": Sweep([dict, list])}).fingerprint() != sweeper.fingerprint()
+    assert Sweeper({"act": Sweep([relu, tanh]), "model": Sweep([list, dict])}).fingerprint() != sweeper.fingerprint()
+    assert Sweeper({"act": Sweep([relu, tanh]), "model": Sweep([dict, list])}).fingerprint() == sweeper.fingerprint()
+
+
+def test_fingerprint_slotted():
+    sweeper = Sweeper({"model": Sweep([Slotted(0.1), Slotted(0.2)])})
+    assert Sweeper({"model": Sweep([Slotted(0.1), Slotted(0.3)])}).fingerprint() != sweeper.fingerprint()
+    assert Sweeper({"model": Sweep([Slotted(0.1), Slotted(0.2)])}).fingerprint() == sweeper.fingerprint()
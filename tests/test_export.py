@@ -0,0 +1,59 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import csv
+import io
+import json
+import pytest
+import classifiedjson
+from configsweep import Sweep, Sweeper
+
+
+def make_config():
+    return {"strategy": Sweep([
+        {"name": "strategy_one", "max": 10000},
+        {"name": "strategy_two", "min": Sweep([10, 20, 30]), "max": Sweep([10000, 90000])}
+    ]),
+        "datasources": Sweep(["en", "es", "de", "fr"], priority=1)
+    }
+
+
+def test_export_jsonl(tmp_path):
+    path = str(tmp_path / "combos.jsonl")
+    sweeper = Sweeper(make_config())
+    assert sweeper.export(path, include_config=True, buffer_size=5) == 28
+    with open(path, 'r') as f:
+        records = [json.loads(line) for line in f]
+    combos = list(sweeper)
+    assert [r["index"] for r in records] == list(range(28))
+    for record, combo in zip(records, combos):
+        assert record["assignments"] == combo.assignments
+        assert classifiedjson.loads(json.dumps(record["config"])) == combo.config
+    assert records[1]["values"] == {"datasources": "en", "strategy": "<complex_value>[1]",
+                                    "strategy.min": 10, "strategy.max": 10000}
+
+
+def test_export_csv():
+    sweeper = Sweeper([make_config(), {"y": Sweep([1, 2, 3])}])
+    f = io.StringIO()
+    assert sweeper.export(f, format="csv", start=26, stop=30) == 4
+    rows = list(csv.reader(io.StringIO(f.getvalue())))
+    assert rows[0] == ["index", "datasources", "strategy", "strategy.min", "strategy.max", "y"]
+    assert rows[1] == ["26", "fr", "<complex_value>[1]", "30", "10000", ""]
+    assert rows[3] == ["28", "", "", "", "", "1"]
+    assert len(rows) == 5
+
+
+def test_export_shard():
+    sweeper = Sweeper(make_config())
+    indices = []
+    for shard_id in range(3):
+        f = io.StringIO()
+        sweeper.export(f, shard=(shard_id, 3), strategy="priority-aware")
+        shard = [json.loads(line)["index"] for line in f.getvalue().splitlines()]
+        assert shard == sorted(shard)
+        indices.extend(shard)
+    assert sorted(indices) == list(range(28))
+
+    with pytest.raises(ValueError) as e_info:
+        sweeper.export(io.StringIO(), format="parquet")
@@ -0,0 +1,56 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import pytest
+from configsweep import Hyperband, SuccessiveHalving, Sweep, Sweeper
+
+
+def train(combo, budget):
+    # better with a bigger lr and more budget
+    return combo.config["lr"] * budget + combo.config["seed"]
+
+
+def make_sweeper():
+    return Sweeper({"lr": Sweep([0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]), "seed": Sweep([0, 1, 2])})
+
+
+def test_successive_halving():
+    sweeper = make_sweeper()
+    halving = SuccessiveHalving(sweeper, min_budget=1, max_budget=9, eta=3)
+    assert halving.budgets() == [1, 3, 9]
+    # each rung eta times the one before, down from the max budget
+    assert SuccessiveHalving(sweeper, min_budget=1, max_budget=10, eta=3).budgets() == [10 / 9, 10 / 3, 10]
+    assert SuccessiveHalving(sweeper, min_budget=2, max_budget=16, eta=2).budgets() == [2, 4, 8, 16]
+    assert SuccessiveHalving(sweeper, min_budget=5, max_budget=5).budgets() == [5]
+    assert SuccessiveHalving(sweeper, min_budget=0.5, max_budget=1.5).budgets() == [0.5, 1.5]
+    seen = []
+    best = halving.run(train, executor="thread", max_workers=2,
+                       callback=lambda index, budget, score: seen.append((index, budget)))
+    # 27 -> 9 -> 3
+    assert [budget for _, budget in seen].count(1) == 27
+    assert [budget for _, budget in seen].count(3) == 9
+    assert [budget for _, budget in seen].count(9) == 3
+    assert len(halving.history) == 39
+    assert [sweeper[index].config for index, _, _ in best] == [
+        {"lr": 0.9, "seed": 2}, {"lr": 0.8, "seed": 2}, {"lr": 0.7, "seed": 2}]
+    assert best[0][1] == 9
+
+    # lower is better
+    best = SuccessiveHalving(sweeper, 1, 9, maximize=False).run(train, executor="thread", indices=range(0, 27, 2))
+    assert sweeper[best[0][0]].config == {"lr": 0.1, "seed": 0}
+
+    with pytest.raises(ValueError) as e_info:
+        SuccessiveHalving(sweeper, 10, 1)
+
+
+def test_hyperband():
+    sweeper = make_sweeper()
+    hyperband = Hyperband(sweeper, min_budget=1, max_budget=9, eta=3, seed=5)
+    best = hyperband.run(train, executor="thread", max_workers=2)
+    # the last rung of each bracket: 9 -> 3 -> 1, 5 -> 1 and 3 at the max budget
+    assert len(best) == 1 + 1 + 3
+    assert all(budget == 9 for _, budget, _ in best)
+    assert [s for _, _, s in best] == sorted((s for _, _, s in best), reverse=True)
+    # same samples with the same seed
+    again = Hyperband(sweeper, min_budget=1, max_budget=9, eta=3, seed=5).run(train, executor="thread")
+    assert again == best
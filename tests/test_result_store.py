@@ -0,0 +1,155 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import pytest
+import threading
+from dataclasses import dataclass
+from configsweep import ResultStore, Sweep, Sweeper
+
+
+@dataclass
+class Model:
+    rate: float = 0.1
+    layers: list = None
+
+
+calls = []
+calls_lock = threading.Lock()
+
+
+def train(combo):
+    with calls_lock:
+        calls.append(combo.index)
+    return {"score": combo.config["model"].rate * combo.config["size"]}
+
+
+def make_config(rates):
+    return {"model": Model(Sweep(rates), [1, 2, 3]), "size": Sweep([10, 20])}
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_map_cache(tmp_path, ordered):
+    path = str(tmp_path / "results.db")
+    calls.clear()
+    with ResultStore(path, batch_size=3) as store:
+        sweeper = Sweeper(make_config([0.1, 0.2]))
+        results = list(sweeper.map(train, executor="thread", max_workers=2, ordered=ordered, cache=store))
+        assert sorted(results) == [(c.index, train(c)) for c in sweeper]
+        assert len(store) == 4
+
+    # a value added to a sweep only runs the new combinations
+    calls.clear()
+    with ResultStore(path) as store:
+        sweeper = Sweeper(make_config([0.1, 0.05, 0.2]))
+        results = list(sweeper.map(train, executor="thread", max_workers=2, ordered=ordered, cache=store))
+        assert sorted(calls) == [2, 3]
+        if ordered:
+            assert [i for i, _ in results] == list(range(6))
+        assert sorted(results) == [(c.index, train(c)) for c in sweeper]
+        assert len(store) == 6
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_map_cache_streams(tmp_path, monkeypatch, ordered):
+    monkeypatch.setattr(Sweeper, "_CACHE_BATCH", 5)
+    keys = []
+    combination_key = Sweeper.combination_key
+    monkeypatch.setattr(Sweeper, "combination_key", lambda self, i: keys.append(i) or combination_key(self, i))
+    with ResultStore(str(tmp_path / "results.db")) as store:
+        sweeper = Sweeper(make_config([0.01 * i for i in range(100)]))
+        expected = [(c.index, train(c)) for c in sweeper]
+        # half of them already have a result
+        for index, result in expected[::2]:
+            store.put(sweeper.combination_key(index), result)
+
+        for schedule in ["chunks", "locality"]:
+            keys.clear()
+            results = sweeper.map(train, executor="thread", max_workers=2, ordered=ordered, cache=store,
+                                  schedule=schedule)
+            first = next(results)
+            if schedule == "chunks":
+                # only the keys for the first few windows are worked out before the first result
+                assert len(keys) <= 15
+            else:
+                # the scheduler needs them all
+                assert len(keys) == 200
+            results = [first] + list(results)
+            if ordered:
+                assert results == expected
+            assert sorted(results) == expected
+            assert len(store) == 200
+
+
+def test_combination_key():
+    sweeper = Sweeper(make_config([0.1, 0.2]))
+    keys = [sweeper.combination_key(i) for i in range(len(sweeper))]
+    assert len(set(keys)) == 4
+    # doesn't depend on the order of dict items or the iteration state
+    next(iter(sweeper))
+    other = Sweeper({"size": Sweep([20, 10]), "model": Model(Sweep([0.2, 0.1]), [1, 2, 3])})
+    assert [other.combination_key(i) for i in range(len(other))] == [keys[3], keys[1], keys[2], keys[0]]
+    assert sweeper.combination_key(1) == keys[1]
+    # the rest of the config matters too
+    assert Sweeper({"model": Model(Sweep([0.1, 0.2]), [1, 2]), "size": Sweep([10, 20])}).combination_key(0) != keys[0]
+
+
+def test_store(tmp_path):
+    store = ResultStore(str(tmp_path / "results.db"), batch_size=100)
+    store.put("a", [1, 2])
+    # found before it's written
+    assert "a" in store
+    assert store.get("a") == [1, 2]
+    assert store.get("b", 5) == 5
+    store.close()
+
+    store = ResultStore(str(tmp_path / "results.db"))
+    assert store.get_many(["a", "b"]) == {"a": [1, 2]}
+    store.close()
+
+
+def relu(x):
+    return max(x, 0)
+
+
+def tanh(x):
+    return x
+
+
+class A:
+    pass
+
+
+class B:
+    pass
+
+
+@dataclass
+class Slotted:
+    __slots__ = ("rate", "size")
+    rate: float
+    size: int
+
+
+def test_combination_key_named_values():
+    # functions and classes are keyed by name, not all the same
+    sweeper = Sweeper({"act": Sweep([relu, tanh]), "model": Sweep([A, B])})
+    assert len({sweeper.combination_key(i) for i in range(len(sweeper))}) == 4
+
+
+def test_combination_key_same_sweep():
+    # the same Sweep object in two places is two sweeps
+    s = Sweep([1, 2])
+    sweeper = Sweeper({"a": s, "b": s})
+    keys = [sweeper.combination_key(i) for i in range(len(sweeper))]
+    assert len(set(keys)) == 4
+    assert keys == [Sweeper({"a": c.config["a"], "b": c.config["b"]}).combination_key(0) for c in sweeper]
+    # and in different values of the same sweep
+    sweeper = Sweeper({"x": Sweep([{"y": s}, {"y": s, "z": 1}])})
+    assert len({sweeper.combination_key(i) for i in range(len(sweeper))}) == 4
+
+
+def test_combination_key_slotted():
+    sweeper = Sweeper({"model": Slotted(Sweep([0.1, 0.2]), 10)})
+    keys = [sweeper.combination_key(i) for i in range(len(sweeper))]
+    assert len(set(keys)) == 2
+    assert keys[1] == Sweeper({"model": Slotted(0.2, 10)}).combination_key(0)
@@ -0,0 +1,144 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import gc
+import pytest
+import weakref
+from array import array
+from dataclasses import dataclass, make_dataclass
+from configsweep import Sweep, sweep_dag
+from configsweep.sweep_dag import SweepDag
+
+
+def make_config():
+    return {"strategy": Sweep([
+        {"name": "strategy_one", "max": 10000},
+        {"name": "strategy_two", "min": Sweep([10, 20, 30]), "max": Sweep([10000, 90000])}
+    ]),
+        "datasources": Sweep(["en", "es", "de", "fr"], priority=1)
+    }
+
+
+def test_columns():
+    dag = SweepDag(make_config())
+    # pre-order with children sorted by priority
+    assert [n.object_name for n in dag.nodes] == ["datasources", "strategy", "strategy.min", "strategy.max"]
+    assert [n.column for n in dag.nodes] == [0, 1, 2, 3]
+    assert dag.nodes[1].end_column == 4
+    assert dag.width == 4
+    assert dag.count == 28
+
+
+def test_rows():
+    lazy = SweepDag(make_config())
+    eager = SweepDag(make_config(), lazy=False)
+    assert lazy.rows is None
+    # one contiguous array of value indices
+    assert isinstance(eager.rows, array)
+    assert len(eager.rows) == eager.count * eager.width
+
+    assert list(lazy.row(0)) == [0, 0, -1, -1]
+    assert list(lazy.row(1)) == [0, 1, 0, 0]
+    assert list(lazy.row(2)) == [0, 1, 0, 1]
+    assert list(lazy.row(27)) == [3, 1, 2, 1]
+    for i in range(lazy.count):
+        assert lazy.row(i) == eager.row(i)
+    with pytest.raises(IndexError) as e_info:
+        lazy.row(28)
+
+
+def test_slots():
+    dag = SweepDag(make_config())
+    with pytest.raises(AttributeError) as e_info:
+        dag.root_node.extra = 1
+
+
+@dataclass
+class Slotted:
+    __slots__ = ("rate", "layers")
+    rate: float
+    layers: list
+
+
+def test_scan():
+    config = {"data": [float(i) for i in range(1000)],
+              "raw": b"bytes",
+              "model": Slotted(Sweep([0.1, 0.2]), [{"size": 1}, {"size": Sweep([8, 16])}])}
+    dag = SweepDag(config)
+    assert [n.object_name for n in dag.nodes] == ["model.rate", "model.layers[1].size"]
+    assert dag.nodes[1].path == ((None, "model", None), ("layers", None, None), (None, None, 1), (None, "size", None))
+    # only the containers on the way to a sweep
+    assert id(config["model"].layers[1]) in dag.sweep_containers
+    assert id(config["model"].layers[0]) not in dag.sweep_containers
+    assert id(config["data"]) not in dag.sweep_containers
+
+
+@dataclass
+class WithExtra:
+    rate: float = 0.1
+
+    def __post_init__(self):
+        self.extra = {"size": Sweep([8, 16])}
+
+
+@dataclass(init=False)
+class Reordered:
+    a: int
+    b: int
+
+    def __init__(self, a, b):
+        self.b = b
+        self.a = a
+
+
+def test_scan_fields():
+    # attributes outside the fields, and in the order they were set
+    dag = SweepDag({"x": WithExtra(Sweep([0.1, 0.2])), "y": Reordered(Sweep([1, 2]), Sweep([3, 4]))})
+    assert [n.object_name for n in dag.nodes] == ["x.rate", "x.extra.size", "y.b", "y.a"]
+
+
+def test_scan_type_caches(monkeypatch):
+    # types seen in configs aren't kept forever
+    monkeypatch.setattr(sweep_dag, "_TYPE_CACHE_SIZE", 3)
+    refs = []
+    for i in range(10):
+        local = make_dataclass(f"Local{i}", [("rate", float)])
+        refs.append(weakref.ref(local))
+        assert SweepDag({"model": local(Sweep([0.1, 0.2]))}).count == 2
+        del local
+    gc.collect()
+    assert len(sweep_dag._type_kinds) <= 3 and len(sweep_dag._field_names) <= 3
+    assert refs[0]() is None
+
+
+def test_scan_deep():
+    # deeper than the recursion limit
+    config = {"leaf": Sweep([1, 2])}
+    for _ in range(5000):
+        config = {"next": config}
+    dag = SweepDag(config)
+    assert dag.count == 2
+    assert dag.nodes[0].object_name.endswith("next.next.leaf")
+
+
+def test_scan_cycle():
+    config = {"a": Sweep([1, 2]), "items": []}
+    config["items"].append(config)
+    with pytest.raises(ValueError) as e_info:
+        SweepDag(config)
+    # shared, not a cycle
+    shared = {"x": 1}
+    assert SweepDag({"a": Sweep([shared, shared]), "b": shared}).count == 2
+
+
+def test_priority_groups_levels():
+    dag = SweepDag(make_config())
+    assert [node.object_name for node in dag.nodes] == ["datasources", "strategy", "strategy.min", "strategy.max"]
+    assert dag.priority_groups() == dag.priority_groups(1) == [(i * 7, i * 7 + 7) for i in range(4)]
+    # strategy_one is a single combination, strategy_two has 6
+    assert dag.priority_groups(2)[:2] == [(0, 1), (1, 7)]
+    assert dag.priority_groups(3)[:4] == [(0, 1), (1, 3), (3, 5), (5, 7)]
+    assert len(dag.priority_groups(10)) == dag.count
+    for levels in range(1, 5):
+        for start, stop in dag.priority_groups(levels):
+            assert len({tuple(dag.row(i)[:levels]) for i in range(start, stop)}) == 1
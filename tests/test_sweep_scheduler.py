@@ -0,0 +1,51 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import pytest
+from configsweep.sweep_scheduler import LocalityScheduler
+
+
+def drain(scheduler, workers, chunksize):
+    # round robin like workers that all run at the same speed
+    done = {worker: [] for worker in range(workers)}
+    active = set(range(workers))
+    while len(active):
+        for worker in sorted(active):
+            chunk = scheduler.next_chunk(worker, chunksize)
+            if chunk is None:
+                active.remove(worker)
+            else:
+                done[worker].extend(chunk)
+    return done
+
+
+def test_groups_stay_on_a_worker():
+    # 4 groups of 6 with units of 3
+    keys = [(p // 6, p // 3) for p in range(24)]
+    scheduler = LocalityScheduler(keys, 2)
+    done = drain(scheduler, 2, 2)
+    assert sorted(done[0] + done[1]) == list(range(24))
+    for positions in done.values():
+        groups = [keys[p][0] for p in positions]
+        # each group shows up in one run for the worker and only on one worker
+        assert len(set(groups)) == len([g for i, g in enumerate(groups) if i == 0 or groups[i - 1] != g])
+        assert len(positions) == 12
+    assert scheduler.steals == 0
+
+
+def test_steal():
+    # one big group and one small one on 3 workers
+    keys = [(0, p // 4) for p in range(16)] + [(1, 4)] * 2
+    scheduler = LocalityScheduler(keys, 3)
+    done = drain(scheduler, 3, 1)
+    assert sorted(done[0] + done[1] + done[2]) == list(range(18))
+    assert all(len(positions) for positions in done.values())
+    assert scheduler.steals > 0
+    # stolen work is whole units while there's more than one unit left
+    first_steal = [p for p in done[2] if keys[p][0] == 0]
+    assert first_steal[:4] == [8, 9, 10, 11]
+
+
+def test_bad_workers():
+    with pytest.raises(ValueError) as e_info:
+        LocalityScheduler([], 0)
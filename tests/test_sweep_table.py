@@ -0,0 +1,58 @@
+# SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
+# SPDX-License-Identifier: MIT
+
+import pytest
+from dataclasses import dataclass
+from configsweep import Sweep, Sweeper
+
+
+@dataclass
+class Model:
+    rate: float = 0.1
+    layers: list = None
+
+
+def make_config():
+    return {"strategy": Sweep([
+        {"name": "strategy_one", "max": 10000},
+        {"name": "strategy_two", "min": Sweep([10, 20, 30]), "max": Sweep([10000, 90000])}
+    ]),
+        "model": Model(Sweep([0.1, 0.2]), [1, 2, 3]),
+        "datasources": Sweep(["en", "es", "de", "fr"], priority=1)
+    }
+
+
+def score(combo):
+    if "y" in combo.config:
+        return combo.config["y"]
+    return combo.config["model"].rate * len(combo.config["strategy"])
+
+
+@pytest.mark.parametrize("materialize", ["deepcopy", "shared"])
+def test_table(tmp_path, materialize):
+    path = str(tmp_path / "sweep.table")
+    sweeper = Sweeper([make_config(), {"y": Sweep([1, 2, 3])}], materialize=materialize)
+    combos = list(sweeper)
+    sweeper.compile(path)
+
+    table = Sweeper.open_table(path)
+    assert len(table) == len(sweeper) == 59
+    assert table.fingerprint() == sweeper.fingerprint()
+    for i in [0, 58, 7, 30, 31]:
+        combo = table[i]
+        assert combo.config == combos[i].config
+        assert combo.description == combos[i].description
+        assert combo.changed_paths == sweeper[i].changed_paths
+    assert [c.config for c in table] == [c.config for c in combos]
+    # shared materialization still finds the containers with sweeps after unpickling
+    assert table[1].config["model"] is not table[2].config["model"]
+
+    results = list(table.map(score, executor="process", max_workers=2))
+    assert results == [(c.index, score(c)) for c in combos]
+
+
+def test_table_not_a_table(tmp_path):
+    path = tmp_path / "other.table"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError) as e_info:
+        Sweeper.open_table(str(path))
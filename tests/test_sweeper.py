@@ -1,9 +1,15 @@
 # SPDX-FileCopyrightText: Coypright © 2024 Shooting Soul Ventures, LLC <jg@shootingsoul.com>
 # SPDX-License-Identifier: MIT
 
+import asyncio
+import io
+import os
+import pickle
+import sys
+import threading
 import pytest
 from dataclasses import dataclass, field
-from configsweep import Sweep, Sweeper
+from configsweep import Constraint, Sweep, Sweeper, SweepStats
 from enum import Enum
 from typing import Any
 from copy import deepcopy
@@ -263,39 +269,63 @@ def test_sweep_sweep():
     with pytest.raises(TypeError) as e_info:
         sweeper = Sweeper(config)
 
-# copy option not available . . .
-# def test_copy():
-#     config = {"x": 123, "y": Sweep([10,20,30]), "c": 456 }
-#     original_config = deepcopy(config)
-
-#     # first time, let sweeper make a copy and verify config still matches original
-#     sweeper = Sweeper(config)
-#     iterator = iter(sweeper)
-#     combo = next(iterator)
-#     assert combo.config['y'] == 10
-#     combo = next(iterator)
-#     assert combo.config['y'] == 20
-#     combo = next(iterator)
-#     assert combo.config['y'] == 30
-#     with pytest.raises(StopIteration) as e_info:
-#         next(iterator)
-#     assert config == original_config
-
-#     # second time, no copy, make sure sweep still works
-#     # and config matches original after done sweeping
-#     # config won't match original while sweeping
-#     sweeper = Sweeper(config, copy = False)
-#     sweeper._copy
-#     iterator = iter(sweeper)
-#     combo = next(iterator)
-#     assert combo.config['y'] == 10
-#     combo = next(iterator)
-#     assert combo.config['y'] == 20
-#     combo = next(iterator)
-#     assert combo.config['y'] == 30
-#     with pytest.raises(StopIteration) as e_info:
-#         next(iterator)
-#     assert config == original_config
+def test_copy():
+    config = {"x": 123, "y": Sweep([10, 20, 30]), "c": 456}
+    original_config = deepcopy(config)
+
+    # first time, let sweeper make a copy and verify config still matches original
+    sweeper = Sweeper(config)
+    assert [combo.config['y'] for combo in sweeper] == [10, 20, 30]
+    assert config == original_config
+
+    # second time, no copy, make sure sweep still works
+    # and config matches original after done sweeping
+    # config won't match original while sweeping
+    sweeper = Sweeper(config, copy_configs=False)
+    assert sweeper._config_templates[0] is config
+    iterator = iter(sweeper)
+    combo = next(iterator)
+    assert combo.config['y'] == 10
+    combo = next(iterator)
+    assert combo.config['y'] == 20
+    combo = next(iterator)
+    assert combo.config['y'] == 30
+    with pytest.raises(StopIteration) as e_info:
+        next(iterator)
+    assert config == original_config
+
+
+def test_configs_built_lazily():
+    configs = [{"x": i, "y": Sweep([10, 20, 30])} for i in range(4)]
+    configs[3]["y"] = Sweep([])
+    originals = deepcopy(configs)
+    sweeper = Sweeper(configs, copy_configs=False)
+    # only the first config's sweep is built to start with
+    assert len(sweeper._dags.built()) == 1
+    assert [combo.config["x"] for combo in sweeper[0:4]] == [0, 0, 0, 1]
+    assert len(sweeper._dags.built()) == 2
+
+    iterator = iter(sweeper)
+    combos = [next(iterator) for _ in range(7)]
+    assert [(c.config["x"], c.config["y"]) for c in combos[-2:]] == [(1, 30), (2, 10)]
+    # the configs iterated past are released with their sweep objects back in place
+    assert sweeper._dags.built() == [sweeper._dags[2]]
+    assert configs[:2] == originals[:2]
+
+    # random access and export put the caller's config back too
+    config = {"a": Sweep([1, 2]), "b": 3}
+    sweeper_uncopied = Sweeper(config, copy_configs=False)
+    assert sweeper_uncopied[1].config == {"a": 2, "b": 3}
+    assert sweeper_uncopied.sample(1, seed=1)[0].config["b"] == 3
+    assert config == {"a": Sweep([1, 2]), "b": 3}
+    sweeper_uncopied.export(io.StringIO(), include_config=True)
+    assert config == {"a": Sweep([1, 2]), "b": 3}
+
+    # the bad config only shows up when it's needed
+    with pytest.raises(ValueError) as e_info:
+        len(sweeper)
+    # released configs are built again for random access
+    assert sweeper[4].config == {"x": 1, "y": 20}
 
 
 def test_multiple_configs():
@@ -341,3 +371,643 @@ def test_nested_priority():
     assert combo.description == "datasources=en\nstrategy=<complex_value>[0]"
     combo = next(iterator)
     assert combo.description == "datasources=en\nstrategy=<complex_value>[1] & strategy.min=10\nstrategy=<complex_value>[1] & strategy.max=10000"
+
+
+def test_lazy_matches_eager():
+    config = {"strategy": Sweep([
+        {"name": "strategy_one", "max": 10000},
+        {"name": "strategy_two", "min": Sweep([10, 20, 30]), "max": Sweep([10000, 90000])}
+    ]),
+        "metric": MyMetric(min=Sweep([1, 2]), max=Sweep([5, 6, 7], priority=2)),
+        "datasources": Sweep(["en", "es", "de", "fr"], priority=1)
+    }
+
+    eager = Sweeper(config, lazy=False)
+    lazy = Sweeper(config)
+    assert len(eager) == len(lazy) == 4 * 3 * 2 * 7
+    for e, l in zip(eager, lazy):
+        assert e.index == l.index
+        assert e.description == l.description
+        assert e.config == l.config
+
+
+def test_lazy_large():
+    # 10^10 combinations, nothing is built up front
+    config = {f"axis{i}": Sweep(list(range(10))) for i in range(10)}
+    sweeper = Sweeper(config)
+    assert len(sweeper) == 10 ** 10
+    iterator = iter(sweeper)
+    combo = next(iterator)
+    assert all(v == 0 for v in combo.config.values())
+    combo = next(iterator)
+    assert combo.config["axis9"] == 1
+    assert combo.config["axis8"] == 0
+
+
+def test_random_access():
+    config = {"strategy": Sweep([
+        {"name": "strategy_one", "max": 10000},
+        {"name": "strategy_two", "min": Sweep([10, 20, 30]), "max": Sweep([10000, 90000])}
+    ]),
+        "datasources": Sweep(["en", "es", "de", "fr"], priority=1)
+    }
+    config_racing = MyConfig("racing")
+    config_racing.day_part = Sweep([MyDayPart.DAWN, None, MyDayPart.DUSK])
+
+    sweeper = Sweeper([config, config_racing])
+    combos = list(sweeper)
+    assert len(combos) == 28 + 3
+
+    # out of order access gives the same combination as iterating
+    for i in [30, 5, 27, 28, 0, 13]:
+        combo = sweeper[i]
+        assert combo.index == combos[i].index == i
+        assert combo.description == combos[i].description
+        assert combo.config == combos[i].config
+    assert sweeper.combination(29).config.day_part is None
+    assert sweeper[-1].config.day_part == MyDayPart.DUSK
+
+    sliced = sweeper[26:31:2]
+    assert [c.index for c in sliced] == [26, 28, 30]
+    assert [c.config for c in sliced] == [combos[i].config for i in [26, 28, 30]]
+
+    with pytest.raises(IndexError) as e_info:
+        sweeper[31]
+    with pytest.raises(IndexError) as e_info:
+        sweeper.combination(-1)
+
+
+@pytest.mark.parametrize("strategy", ["contiguous", "strided", "priority-aware"])
+def test_shard(strategy):
+    config = {"strategy": Sweep([
+        {"name": "strategy_one", "max": 10000},
+        {"name": "strategy_two", "min": Sweep([10, 20, 30]), "max": Sweep([10000, 90000])}
+    ]),
+        "datasources": Sweep(["en", "es", "de", "fr"], priority=1)
+    }
+    sweeper = Sweeper([config, {"y": Sweep([1, 2, 3])}])
+    combos = list(sweeper)
+
+    seen = []
+    for shard_id in range(3):
+        shard = list(sweeper.shard(shard_id, 3, strategy))
+        assert len(shard)
+        for combo in shard:
+            assert combo.description == combos[combo.index].description
+            assert combo.config == combos[combo.index].config
+        seen.extend(combo.index for combo in shard)
+    assert sorted(seen) == list(range(len(sweeper)))
+
+
+def test_shard_priority_aware():
+    config = {"x": Sweep(list(range(5))),
+              "datasources": Sweep(["en", "es", "de", "fr"], priority=1)}
+    sweeper = Sweeper(config)
+    shards = [list(sweeper.shard(i, 2, "priority-aware")) for i in range(2)]
+    # each datasource is only on one shard
+    datasources = [set(c.config["datasources"] for c in shard) for shard in shards]
+    assert datasources == [{"en", "de"}, {"es", "fr"}]
+    # combinations in index order within each shard
+    for shard in shards:
+        assert [c.index for c in shard] == sorted(c.index for c in shard)
+
+    # uneven groups, no shard is left empty
+    sweeper = Sweeper({"d": Sweep([{"x": Sweep(list(range(100)))}, {"x": Sweep(list(range(100)))}, {"x": 1}],
+                                  priority=1)})
+    assert [len(list(sweeper.shard(i, 3, "priority-aware"))) for i in range(3)] == [100, 100, 1]
+
+    with pytest.raises(ValueError) as e_info:
+        sweeper.shard(2, 2)
+    with pytest.raises(ValueError) as e_info:
+        sweeper.shard(0, 2, "random")
+
+
+def test_materialize_shared():
+    payload = list(range(1000))
+    config = MyConfig("racing", top_three=["LA", Sweep(["Detroit", "Chicago"]), "Philly"],
+                      data={"payload": payload, "grid": (1, [2, Sweep([3, 4])])},
+                      metric=Sweep([MyMetric(5, 10), MyMetric(min=Sweep([0, 1]))]))
+    expected = list(Sweeper(config))
+    combos = list(Sweeper(config, materialize="shared"))
+    assert len(combos) == len(expected) == 2 * 2 * 3
+    for e, c in zip(expected, combos):
+        assert e.index == c.index
+        assert e.description == c.description
+        assert e.config == c.config
+
+    # unswept parts and sweep values are shared, the path to the sweeps is copied
+    first, second = combos[0].config, combos[3].config
+    assert first.data["payload"] is second.data["payload"]
+    assert first.data is not second.data
+    assert first.data["grid"][1] is not second.data["grid"][1]
+    assert first.top_three is not second.top_three
+    assert first.metric is second.metric
+
+
+def test_materialize_unknown():
+    with pytest.raises(ValueError) as e_info:
+        Sweeper({"x": Sweep([1, 2])}, materialize="magic")
+
+
+def sweep_sum(combo):
+    return combo.config["x"] + combo.config["y"]["z"]
+
+
+@pytest.mark.parametrize("executor", ["process", "thread"])
+def test_map(executor):
+    config = {"x": Sweep([1, 2, 3]), "y": {"z": Sweep([10, 20, 30, 40])}}
+    sweeper = Sweeper([config, {"x": 100, "y": {"z": Sweep([5, 6])}}])
+    expected = [(combo.index, sweep_sum(combo)) for combo in sweeper]
+
+    results = list(sweeper.map(sweep_sum, executor=executor, max_workers=2, chunksize=3))
+    assert results == expected
+
+    results = list(sweeper.map(sweep_sum, executor=executor, max_workers=3, ordered=False))
+    assert sorted(results) == expected
+
+    # sweeper still works after mapping
+    assert [(combo.index, sweep_sum(combo)) for combo in sweeper] == expected
+
+
+def sweep_worker(combo):
+    return os.getpid(), threading.get_ident(), combo.config["data"]
+
+
+@pytest.mark.parametrize("executor", ["process", "thread"])
+def test_map_locality(executor):
+    config = {"data": Sweep(["a", "b", "c", "d", "e", "f"], priority=1),
+              "x": Sweep(list(range(4))), "y": Sweep(list(range(5)))}
+    sweeper = Sweeper(config)
+    expected = [(combo.index, combo.config["data"]) for combo in sweeper]
+
+    # not ordered by default, workers go through their groups at the same time
+    results = list(sweeper.map(sweep_worker, executor=executor, max_workers=3, chunksize=4, schedule="locality"))
+    assert sorted((index, data) for index, (_, _, data) in results) == expected
+    ordered = list(sweeper.map(sweep_worker, executor=executor, max_workers=3, chunksize=4, ordered=True,
+                               schedule="locality"))
+    assert [(index, data) for index, (_, _, data) in ordered] == expected
+    # each worker goes through its datasources one at a time, so it loads each one once
+    by_worker = {}
+    for index, (pid, thread, data) in results:
+        by_worker.setdefault((pid, thread), []).append((index, data))
+    assert len(by_worker) == 3
+    for done in by_worker.values():
+        datasources = [data for _, data in sorted(done)]
+        runs = [data for i, data in enumerate(datasources) if i == 0 or datasources[i - 1] != data]
+        assert len(runs) == len(set(runs))
+
+    # fewer groups than workers, so parts of the groups are stolen and all the workers help
+    results = list(sweeper.map(sweep_worker, executor=executor, max_workers=8, chunksize=2, ordered=False,
+                               schedule="locality", indices=range(40)))
+    assert sorted((index, data) for index, (_, _, data) in results) == expected[:40]
+    assert len({(pid, thread) for _, (pid, thread, _) in results}) == 8
+
+    with pytest.raises(ValueError) as e_info:
+        sweeper.map(sweep_worker, schedule="random")
+
+
+def sweep_fail(combo):
+    if combo.index == 3:
+        raise RuntimeError("bad combo")
+    return combo.index
+
+
+def test_map_error():
+    sweeper = Sweeper({"x": Sweep(list(range(10)))})
+    with pytest.raises(RuntimeError) as e_info:
+        list(sweeper.map(sweep_fail, executor="thread", max_workers=2, chunksize=1))
+    with pytest.raises(ValueError) as e_info:
+        sweeper.map(sweep_fail, executor="gpu")
+
+
+def test_async_iteration():
+    sweeper = Sweeper({"x": Sweep([1, 2, 3]), "y": Sweep(["a", "b"])})
+
+    async def collect():
+        return [combo async for combo in sweeper]
+
+    combos = asyncio.run(collect())
+    assert [c.index for c in combos] == list(range(6))
+    assert [c.config for c in combos] == [c.config for c in sweeper]
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_amap(ordered):
+    sweeper = Sweeper({"x": Sweep(list(range(20)))})
+    running = 0
+    most_running = 0
+
+    async def evaluate(combo):
+        nonlocal running, most_running
+        running += 1
+        most_running = max(most_running, running)
+        # finish out of order
+        await asyncio.sleep(0.001 * (combo.index % 3))
+        running -= 1
+        return combo.config["x"] * 2
+
+    async def collect():
+        return [r async for r in sweeper.amap(evaluate, concurrency=4, ordered=ordered)]
+
+    results = asyncio.run(collect())
+    assert most_running == 4
+    expected = [(i, i * 2) for i in range(20)]
+    if ordered:
+        assert results == expected
+    else:
+        assert results != expected
+        assert sorted(results) == expected
+
+
+def test_amap_cancel():
+    sweeper = Sweeper({"x": Sweep(list(range(20)))})
+    started = []
+    cancelled = []
+
+    async def evaluate(combo):
+        started.append(combo.index)
+        if combo.index == 2:
+            raise RuntimeError("bad combo")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(combo.index)
+            raise
+
+    async def collect():
+        return [r async for r in sweeper.amap(evaluate, concurrency=4)]
+
+    with pytest.raises(RuntimeError) as e_info:
+        asyncio.run(collect())
+    assert started == [0, 1, 2, 3]
+    assert sorted(cancelled) == [0, 1, 3]
+
+
+def test_lazy_description():
+    config = {"strategy": Sweep([
+        {"name": "strategy_one", "max": 10000},
+        {"name": "strategy_two", "min": Sweep([10, 20, 30]), "max": Sweep([10000, 90000])}
+    ]),
+        "datasources": Sweep(["en", "es", "de", "fr"], priority=1)
+    }
+    sweeper = Sweeper(config)
+    combo = sweeper[1]
+    assert combo._description is None
+    assert combo.assignments == {"datasources": 0, "strategy": 1, "strategy.min": 0, "strategy.max": 0}
+    assert combo.assigned_values["strategy.min"] == 10
+    assert combo.assigned_values["datasources"] == "en"
+    assert combo._description is None
+    assert combo.description == "datasources=en\nstrategy=<complex_value>[1] & strategy.min=10\nstrategy=<complex_value>[1] & strategy.max=10000"
+
+    # no dag taken along when pickled
+    combo = pickle.loads(pickle.dumps(sweeper[0]))
+    assert combo._dag is None
+    assert combo.description == "datasources=en\nstrategy=<complex_value>[0]"
+    assert combo.assignments == {"datasources": 0, "strategy": 0}
+
+
+def test_description_nested_in_value():
+    sweeper = Sweeper({"metric": Sweep([MyMetric(min=Sweep([5, 6]), max=0), MyMetric(1, 2)])})
+    combos = list(sweeper)
+    # a value holding a sweep reads differently for each nested value, so it isn't described by its text
+    assert [c.description for c in reversed(combos)] == [
+        "metric=MyMetric(min=1, max=2)",
+        "metric=<complex_value>[0] & metric.min=6",
+        "metric=<complex_value>[0] & metric.min=5"]
+
+
+def test_changed_paths():
+    config = {"strategy": Sweep([
+        {"name": "strategy_one", "max": 10000},
+        {"name": "strategy_two", "min": Sweep([10, 20, 30]), "max": Sweep([10000, 90000])}
+    ]),
+        "datasources": Sweep(["en", "es", "de", "fr"], priority=1)
+    }
+    sweeper = Sweeper(config)
+    combos = list(sweeper)
+    assert combos[0].changed_paths == ["datasources", "strategy"]
+    assert combos[1].changed_paths == ["strategy", "strategy.min", "strategy.max"]
+    assert combos[2].changed_paths == ["strategy.max"]
+    assert combos[3].changed_paths == ["strategy.min", "strategy.max"]
+    assert combos[7].changed_paths == ["datasources", "strategy"]
+    assert combos[8].changed_paths == ["strategy", "strategy.min", "strategy.max"]
+
+    # same from random access in any order
+    for i in [8, 2, 0, 27, 3, 7, 1]:
+        combo = sweeper[i]
+        assert combo.changed_paths == combos[i].changed_paths
+        assert combo.config == combos[i].config
+
+    # first combo of the next config has everything changed
+    sweeper = Sweeper([{"x": Sweep([1, 2])}, {"x": Sweep([1, 2])}])
+    assert [c.changed_paths for c in sweeper] == [["x"], ["x"], ["x"], ["x"]]
+
+
+@pytest.mark.parametrize("materialize", ["deepcopy", "shared"])
+def test_stats(materialize):
+    config = {"strategy": Sweep([
+        {"name": "strategy_one", "max": 10000},
+        {"name": "strategy_two", "min": Sweep([10, 20, 30]), "max": Sweep([10000, 90000])}
+    ]),
+        "datasources": Sweep(["en", "es", "de", "fr"], priority=1),
+        "payload": list(range(100))
+    }
+    stats = SweepStats()
+    sweeper = Sweeper([config, {"x": Sweep([1, 2])}], materialize=materialize, stats=stats)
+    combos = list(sweeper)
+    combos[0].description
+
+    d = stats.to_dict()
+    assert d["combinations"] == 30
+    assert d["dags"] == 2
+    assert d["nodes"] == 5
+    assert d["max_depth"] == 2
+    assert d["bytes_copied"] > 0
+    assert d["phases"]["build"]["count"] == 2
+    assert d["phases"]["copy_templates"]["count"] == 1
+    assert d["phases"]["apply"]["count"] == 30
+    assert d["phases"]["copy"]["count"] == 30
+    assert sum(d["phases"]["copy"]["buckets_us"].values()) == 30
+    assert d["phases"]["describe"]["count"] == 1
+
+    # shared copies less than deepcopy
+    deep_stats = SweepStats()
+    list(Sweeper(config, stats=deep_stats))
+    shared_stats = SweepStats()
+    list(Sweeper(config, materialize="shared", stats=shared_stats))
+    assert shared_stats.bytes_copied < deep_stats.bytes_copied
+
+
+@dataclass
+class MySlotted:
+    __slots__ = ("rate", "layers")
+    rate: float
+    layers: list
+
+
+def test_stats_slotted():
+    stats = SweepStats()
+    sweeper = Sweeper({"model": MySlotted(Sweep([0.1, 0.2]), [1, 2, 3])}, stats=stats)
+    assert sweeper[1].config["model"].rate == 0.2
+    # the fields of the slotted dataclass are counted
+    assert stats.bytes_copied > sys.getsizeof([1, 2, 3])
+
+
+def min_below_max(min, max):
+    return min < max
+
+
+def test_constraints():
+    config = {"strategy": Sweep([
+        {"name": "strategy_one", "max": 10000},
+        {"name": "strategy_two", "min": Sweep([10, 20, 30]), "max": Sweep([15, 25, 35])}
+    ]),
+        "metric": MyMetric(min=Sweep([1, 5, 9]), max=Sweep([4, 8])),
+        "datasources": Sweep(["en", "es", "de", "fr"], priority=1)
+    }
+    constraints = [Constraint(["strategy.min", "strategy.max"], min_below_max),
+                   Constraint(["metric.min", "metric.max"], min_below_max),
+                   Constraint(["datasources"], lambda d: d != "de")]
+    full = list(Sweeper(config))
+    expected = [c.config for c in full
+                if c.config["strategy"]["name"] == "strategy_one" or c.config["strategy"]["min"] < c.config["strategy"]["max"]
+                if c.config["metric"].min < c.config["metric"].max and c.config["datasources"] != "de"]
+
+    for lazy in [True, False]:
+        sweeper = Sweeper(config, lazy=lazy, constraints=constraints)
+        assert len(sweeper) == len(expected) == 3 * 3 * (1 + 6)
+        assert [c.config for c in sweeper] == expected
+        assert sweeper[17].config == expected[17]
+        assert sweeper[-1].config == expected[-1]
+
+    # whole datasource groups are left out
+    sweeper = Sweeper(config, constraints=constraints)
+    groups = [list(sweeper.shard(i, 3, "priority-aware")) for i in range(3)]
+    assert [set(c.config["datasources"] for c in g) for g in groups] == [{"en"}, {"es"}, {"fr"}]
+
+
+def test_constraints_empty():
+    config = {"x": Sweep([1, 2, 3])}
+    sweeper = Sweeper([config, {"y": Sweep([1, 2])}, config],
+                      constraints=[Constraint(["y"], lambda y: y > 5)])
+    assert len(sweeper) == 6
+    assert [c.config["x"] for c in sweeper] == [1, 2, 3, 1, 2, 3]
+
+    with pytest.raises(ValueError) as e_info:
+        Sweeper(config, constraints=[Constraint(["z"], lambda z: True)])
+
+
+@pytest.mark.parametrize("method", ["uniform", "latin_hypercube"])
+def test_sample(method):
+    config = {"strategy": Sweep([
+        {"name": "strategy_one", "max": 10000},
+        {"name": "strategy_two", "min": Sweep([10, 20, 30]), "max": Sweep([10000, 90000])}
+    ]),
+        "datasources": Sweep(["en", "es", "de", "fr"], priority=1)
+    }
+    sweeper = Sweeper([config, {"y": Sweep([1, 2, 3])}])
+    sample = sweeper.sample(10, seed=7, method=method)
+    indices = [c.index for c in sample]
+    assert indices == sorted(set(indices)) and len(indices) == 10
+    for combo in sample:
+        assert combo.config == sweeper[combo.index].config
+    assert [c.index for c in sweeper.sample(10, seed=7, method=method)] == indices
+    # the whole sweep
+    assert [c.index for c in sweeper.sample(len(sweeper), seed=1, method=method)] == list(range(len(sweeper)))
+
+    with pytest.raises(ValueError) as e_info:
+        sweeper.sample(len(sweeper) + 1)
+    with pytest.raises(ValueError) as e_info:
+        sweeper.sample(1, method="grid")
+
+
+def test_sample_large():
+    # 10^12 combinations
+    sweeper = Sweeper({f"axis{i}": Sweep(list(range(10))) for i in range(12)})
+    for method in ["uniform", "latin_hypercube"]:
+        sample = sweeper.sample(1000, seed=3, method=method)
+        assert len(set(c.index for c in sample)) == 1000
+    # each value of a sweep shows up evenly in a latin hypercube
+    values = [c.config["axis0"] for c in sample]
+    assert all(values.count(v) == 100 for v in range(10))
+
+
+def test_sample_constraints():
+    sweeper = Sweeper({"a": Sweep(list(range(10))), "b": Sweep(list(range(10)))},
+                      constraints=[Constraint(["a"], lambda a: a >= 8)])
+    counts = {8: 0, 9: 0}
+    for seed in range(100):
+        sample = sweeper.sample(4, seed=seed, method="latin_hypercube")
+        assert len(set(c.index for c in sample)) == 4
+        for combo in sample:
+            counts[combo.config["a"]] += 1
+    # points on the combinations left out are drawn again, not moved to the next valid one
+    assert 160 < counts[8] < 240 and 160 < counts[9] < 240
+
+    assert Sweeper([]).sample(0, method="latin_hypercube") == []
+    assert sweeper.sample(0, method="latin_hypercube") == []
+
+
+def test_sample_sobol():
+    pytest.importorskip("scipy")
+    sweeper = Sweeper({f"axis{i}": Sweep(list(range(10))) for i in range(12)})
+    sample = sweeper.sample(64, seed=3, method="sobol")
+    assert len(set(c.index for c in sample)) == 64
+
+
+def test_iter_batches():
+    config = {"strategy": Sweep([
+        {"name": "strategy_one", "max": Sweep([1, 2])},
+        {"name": "strategy_two", "min": Sweep([10, 20, 30]), "max": Sweep([10000, 90000])}
+    ]),
+        "datasources": Sweep(["en", "es", "de", "fr"], priority=1)
+    }
+    sweeper = Sweeper([config, {"y": Sweep([1, 2, 3])}])
+    combos = list(sweeper)
+    batches = list(sweeper.iter_batches(5, start=2))
+    # shorter at the end of each config, the first one has 32 combinations
+    assert [len(b) for b in batches] == [5, 5, 5, 5, 5, 5, 3]
+    assert [i for b in batches for i in b.indices] == list(range(2, 35))
+
+    for batch in batches:
+        for k, i in enumerate(batch.indices):
+            assert {name: column[k] for name, column in batch.value_indices.items() if column[k] >= 0} == combos[i].assignments
+            assert {name: batch.values(name)[k] for name in batch.value_indices if batch.mask(name)[k]} == combos[i].assigned_values
+    # strategy.max is under both strategies
+    assert batches[0].values("strategy.max") == [10000, 90000, 10000, 90000, 10000]
+    assert list(batches[0].mask("strategy.min")) == [1, 1, 1, 1, 1]
+    assert list(batches[1].mask("strategy.min")) == [1, 0, 0, 1, 1]
+
+
+@dataclass(frozen=True)
+class MyFrozen:
+    name: str = ""
+    sizes: tuple = ()
+
+
+@dataclass
+class MyPostInit:
+    value: int = 0
+    doubled: int = field(init=False, default=0)
+
+    def __post_init__(self):
+        self.doubled = self.value * 2 if isinstance(self.value, int) else -1
+
+
+@dataclass(init=False)
+class MyCustomInit:
+    a: int
+    b: Any
+
+    def __init__(self, a, b):
+        self.a = a * 2
+        self.b = b
+
+
+class MyCustomInitSubclass(MyMetric):
+    def __init__(self, min, max):
+        super().__init__(min * 2, max)
+
+
+def test_materialize_compiled_custom_init():
+    # a constructor that isn't the generated one isn't called again, same as deepcopy
+    config = {"custom": MyCustomInit(1, Sweep([5, 6])), "subclass": MyCustomInitSubclass(1, Sweep([7, 8]))}
+    sweeper = Sweeper(config, materialize="compiled")
+    assert sweeper._builder(0)
+    assert [c.config for c in sweeper] == [c.config for c in Sweeper(config)]
+    assert sweeper[0].config["custom"].a == 2
+    assert sweeper[0].config["subclass"].min == 2
+
+
+def test_materialize_compiled_same_sweep():
+    # the same Sweep object in two places is two sweeps
+    s = Sweep([1, 2])
+    config = {"a": s, "b": s, "c": Sweep([{"x": s}, {"y": s}])}
+    sweeper = Sweeper(config, materialize="compiled")
+    assert sweeper._builder(0)
+    expected = [c.config for c in Sweeper(config)]
+    assert len(expected) == 16
+    assert [c.config for c in sweeper] == expected
+
+
+def test_materialize_compiled():
+    from collections import OrderedDict, namedtuple
+    Point = namedtuple("Point", ["x", "y"])
+    config = {"strategy": Sweep([
+        {"name": "strategy_one", "max": 10000, "frozen": MyFrozen("a", (1, 2))},
+        {"name": "strategy_two", "min": Sweep([10, 20, 30]), "max": Sweep([10000, 90000])}
+    ]),
+        "metric": MyMetric(min=Sweep([1, 2]), max=Sweep([5, 6, 7], priority=2)),
+        "point": Point(1, [Sweep([2, 3])]),
+        "ordered": OrderedDict([("b", Sweep([1, 2])), ("a", [1, 2, 3])]),
+        "post_init": MyPostInit(Sweep([1, 2])),
+        "day_part": Sweep([MyDayPart.DAWN, MyDayPart.DUSK]),
+        "payload": [[1, 2], {"x": [3.0, 4.0]}],
+    }
+    expected = list(Sweeper(config))
+    for lazy in [True, False]:
+        sweeper = Sweeper(config, lazy=lazy, materialize="compiled")
+        assert sweeper._builder(0)
+        combos = list(sweeper)
+        assert [c.config for c in combos] == [c.config for c in expected]
+        assert [c.changed_paths for c in combos] == [c.changed_paths for c in expected]
+        assert [type(c.config["ordered"]) for c in combos[:1]] == [OrderedDict]
+        # the constructor isn't called again, so post init values are kept as is
+        assert combos[-1].config["post_init"] == expected[-1].config["post_init"]
+        # nothing is shared between combinations
+        assert combos[0].config["payload"][1]["x"] is not combos[1].config["payload"][1]["x"]
+        assert sweeper[7].config == expected[7].config
+
+    # big containers are built in parts
+    config = {"items": [{"id": i, "on": Sweep([True, False]) if i == 150 else True} for i in range(250)],
+              "lookup": {f"k{i}": [i] for i in range(250)},
+              "pairs": tuple([i] for i in range(250)),
+              "empty": ()}
+    sweeper = Sweeper(config, materialize="compiled")
+    assert sweeper._builder(0)
+    assert [c.config for c in sweeper] == [c.config for c in Sweeper(config)]
+
+    # the same object in more than one place falls back to deepcopy
+    shared = {"x": [1, 2]}
+    sweeper = Sweeper({"a": Sweep([1, 2]), "b": shared, "c": shared}, materialize="compiled")
+    combo = sweeper[1]
+    assert sweeper._builder(0) is False
+    assert combo.config["b"] is combo.config["c"]
+
+
+def test_estimate():
+    config = {"strategy": Sweep([
+        {"name": "strategy_one", "max": 10000},
+        {"name": "strategy_two", "min": Sweep([10, 20, 30]), "max": Sweep([10000, 90000])}
+    ]),
+        "data": [float(i) for i in range(1000)],
+        "lr": Sweep([0.1, 0.01])}
+    original_config = deepcopy(config)
+    sweeper = Sweeper(config, stats=SweepStats())
+
+    estimate = Sweeper.estimate(config)
+    assert estimate.combinations == len(sweeper) == 14
+    assert estimate.cardinalities == {"strategy": 2, "strategy.min": 3, "strategy.max": 2, "lr": 2}
+    # same as the bytes copied for each combination in the stats
+    next(iter(sweeper))
+    assert estimate.config_bytes == sweeper._stats.bytes_copied
+    assert estimate.all_configs_bytes == 14 * estimate.config_bytes
+    assert estimate.rows_bytes == 14 * 4 * 4
+    assert estimate.copy_seconds > 0
+    assert estimate.warnings == []
+    # the config is put back the way it was
+    assert config == original_config
+
+    estimate = Sweeper.estimate([config, {"x": Sweep([1, 2, 3])}], memory_budget=1000)
+    assert estimate.combinations == 17
+    assert estimate.cardinalities["x"] == 3
+    assert len(estimate.warnings) == 1 and "Keeping the configs" in estimate.warnings[0]
+    assert estimate.to_dict()["combinations"] == 17
+
+    with pytest.raises(ValueError) as e_info:
+        Sweeper.estimate(config, memory_budget=0)
+
+    # same configs as the sweeper takes, e.g. slotted dataclasses
+    estimate = Sweeper.estimate({"model": MySlotted(Sweep([0.1, 0.2]), [1, 2, 3])})
+    assert estimate.combinations == 2
+    assert estimate.config_bytes > sys.getsizeof([1, 2, 3])